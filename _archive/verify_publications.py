@@ -14,9 +14,13 @@ Usage:
   python verify_publications.py --phase1    # First pass - generates manual_review.md
   python verify_publications.py --phase2    # After review - generates final outputs
   python verify_publications.py             # Run both phases (legacy mode)
+  python verify_publications.py --api-base http://127.0.0.1:8765 --phase1
+                                            # Against a local OpenAlex stand-in
+                                            # (or set OPENALEX_API_BASE)
 """
 
 import json
+import os
 import re
 import sys
 import time
@@ -27,9 +31,13 @@ from urllib.parse import quote
 
 import requests
 
+# The shared OpenAlex client lives in the site root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from openalex_client import OpenAlexClient  # noqa: E402
+
 # Configuration
 MAILTO = "katherine.atkins@ed.ac.uk"
-API_BASE = "https://api.openalex.org/works"
+API_BASE = f"{os.environ.get('OPENALEX_API_BASE', 'https://api.openalex.org').rstrip('/')}/works"
 PUBMED_SEARCH_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 PUBMED_FETCH_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/efetch.fcgi"
 INPUT_FILE = "papers.md"
@@ -41,7 +49,6 @@ PHASE1_CACHE = "phase1_cache.json"
 ERROR_LOG = "api_errors.log"
 REQUEST_DELAY = 0.5  # seconds between API requests
 PUBMED_DELAY = 0.4  # PubMed allows ~3 requests/sec without API key
-MAX_RETRIES = 3
 MAX_CANDIDATES = 5  # Number of candidate matches to show for manual review
 
 # Set up logging
@@ -52,6 +59,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# One pooled session with retry/backoff for every OpenAlex request
+client = OpenAlexClient(MAILTO)
+
 
 def extract_doi_from_url(url: str) -> Optional[str]:
     """Extract DOI from various URL formats."""
@@ -231,25 +241,16 @@ def query_openalex_by_doi(doi: str) -> Optional[dict]:
 
     url = f"{API_BASE}/https://doi.org/{doi}?mailto={MAILTO}"
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 404:
-                logger.info(f"DOI not found: {doi}")
-                return None
-            elif response.status_code == 429:
-                wait_time = (attempt + 1) * 2
-                logger.warning(f"Rate limited, waiting {wait_time}s")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"API error for DOI {doi}: {response.status_code}")
-                return None
-        except Exception as e:
-            logger.error(f"Request error for DOI {doi}: {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(1)
+    try:
+        response = client.get(url)
+        if response.status_code == 200:
+            return response.json()
+        elif response.status_code == 404:
+            logger.info(f"DOI not found: {doi}")
+        else:
+            logger.error(f"API error for DOI {doi}: {response.status_code}")
+    except Exception as e:
+        logger.error(f"Request error for DOI {doi}: {e}")
 
     return None
 
@@ -262,27 +263,18 @@ def query_openalex_by_title(title: str) -> Optional[dict]:
 
     url = f"{API_BASE}?filter=title.search:{quote(title_clean)}&mailto={MAILTO}"
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = requests.get(url, timeout=30)
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get('results', [])
-                if results:
-                    # Return first result (best match)
-                    return results[0]
-                return None
-            elif response.status_code == 429:
-                wait_time = (attempt + 1) * 2
-                logger.warning(f"Rate limited, waiting {wait_time}s")
-                time.sleep(wait_time)
-            else:
-                logger.error(f"API error for title search: {response.status_code}")
-                return None
-        except Exception as e:
-            logger.error(f"Request error for title search: {e}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(1)
+    try:
+        response = client.get(url)
+        if response.status_code == 200:
+            data = response.json()
+            results = data.get('results', [])
+            if results:
+                # Return first result (best match)
+                return results[0]
+        else:
+            logger.error(f"API error for title search: {response.status_code}")
+    except Exception as e:
+        logger.error(f"Request error for title search: {e}")
 
     return None
 
@@ -298,7 +290,7 @@ def query_openalex_candidates(title: str, year: int = None, max_results: int = M
     url = f"{API_BASE}?filter=title.search:{quote(title_clean)}&per-page={max_results}&mailto={MAILTO}"
 
     try:
-        response = requests.get(url, timeout=30)
+        response = client.get(url)
         if response.status_code == 200:
             data = response.json()
             results = data.get('results', [])
@@ -323,7 +315,7 @@ def search_published_version(title: str) -> Optional[dict]:
     url = f"{API_BASE}?filter=title.search:{quote(title_clean)},type:article&mailto={MAILTO}"
 
     try:
-        response = requests.get(url, timeout=30)
+        response = client.get(url)
         if response.status_code == 200:
             data = response.json()
             results = data.get('results', [])
@@ -383,7 +375,7 @@ def query_openalex_by_author_title(first_author: str, title: str, year: int = No
     url = f"{API_BASE}?filter={','.join(filters)}&mailto={MAILTO}"
 
     try:
-        response = requests.get(url, timeout=30)
+        response = client.get(url)
         if response.status_code == 200:
             data = response.json()
             results = data.get('results', [])
@@ -1174,6 +1166,8 @@ def run_phase1():
     else:
         print(f"\n✅ All papers matched! You can run --phase2 to generate outputs.")
 
+    print(f"\n  HTTP: {client.summary()}")
+
 
 def run_phase2():
     """Phase 2: Read manual selections and generate final outputs."""
@@ -1279,11 +1273,21 @@ def run_phase2():
     print(f"  - {OUTPUT_JSON}")
     print(f"  - {OUTPUT_REPORT}")
     print(f"  - {OUTPUT_UPDATED}")
+    print(f"\n  HTTP: {client.summary()}")
     print("\n✅ Complete!")
 
 
 def main():
     """Main entry point with argument handling."""
+    global API_BASE
+    if '--api-base' in sys.argv:
+        i = sys.argv.index('--api-base')
+        if i + 1 == len(sys.argv):
+            print("--api-base needs a URL")
+            sys.exit(1)
+        API_BASE = f"{sys.argv[i + 1].rstrip('/')}/works"
+        del sys.argv[i:i + 2]
+
     if len(sys.argv) > 1:
         if sys.argv[1] == '--phase1':
             run_phase1()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark enrich_from_openalex.py against the local OpenAlex stand-in.
+
+Generates a synthetic library, serves matching works from the local OpenAlex
+stand-in (openalex_standin.py) with a fixed per-request latency, and times one
+request at a time against adaptive concurrency up to --concurrency, starting
+there and starting from 1. All runs must produce identical output and cache files.
+
+With --server-limit the stand-in answers 429 (with Retry-After: 0) whenever
+more requests than that are in flight, to see how far each run gets throttled.
+--error-rate and --throttle-rate inject 5xx errors and 429s into a share of
+requests, the same ones for every run with the same --seed.
+
+Usage:
+  python _benchmarks/bench_enrich.py                          # 200 DOIs, 50 ms latency
+  python _benchmarks/bench_enrich.py -n 500 --latency 0.1     # Larger library, slower server
+  python _benchmarks/bench_enrich.py --concurrency 8 --rate 40
+  python _benchmarks/bench_enrich.py --server-limit 3         # Throttle above 3 in flight
+  python _benchmarks/bench_enrich.py --error-rate 0.05        # Cost of retrying 5% errors
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import enrich_from_openalex  # noqa: E402
+from openalex_standin import Faults, WorkStore, start_server  # noqa: E402
+
+
+def make_library(n: int) -> tuple[list[dict], dict]:
+    """Build n synthetic CSL-JSON records and the OpenAlex works for 90% of them."""
+    publications = []
+    works = {}
+    for i in range(n):
+        doi = f"10.5555/bench.{i:05d}"
+        publications.append({'id': f"bench{i}", 'title': f"Benchmark paper {i}", 'DOI': doi})
+        if i % 10:
+            works[doi] = {
+                'id': f"https://openalex.org/W{i}",
+                'doi': f"https://doi.org/{doi}",
+                'cited_by_count': i,
+                'open_access': {'is_oa': False, 'oa_url': None},
+            }
+    return publications, works
+
+
+def run(workdir: Path, name: str, store: WorkStore, faults: Faults, **kwargs) -> tuple[float, int, int, bytes, dict]:
+    """
+    Run one enrichment from an empty cache; return seconds, requests, 429s, output, cache.
+
+    Each run gets a fresh stand-in, so every run sees the same injected faults.
+    """
+    output = workdir / f"{name}.json"
+    cache = workdir / f"{name}_cache.json"
+    server, counts = start_server(store, faults)
+    enrich_from_openalex.set_api_base(f"http://127.0.0.1:{server.server_port}")
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        enrich_from_openalex.enrich_publications(str(workdir / 'library.json'), str(output), str(cache), **kwargs)
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    # Fetch timestamps differ between runs; everything else must match
+    entries = json.loads(cache.read_text())
+    for entry in entries.values():
+        entry.pop('fetched_at', None)
+    return elapsed, counts['requests'], counts['throttled'], output.read_bytes(), entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sequential vs adaptive concurrent OpenAlex enrichment.')
+    parser.add_argument('-n', type=int, default=200, help='Number of synthetic DOIs (default: 200)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stand-in latency in seconds (default: 0.05)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Maximum concurrency, and where the first adaptive run starts (default: 8)')
+    parser.add_argument('--server-limit', type=int, default=0,
+                        help='Stand-in answers 429 above this many requests in flight (default: no limit)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered 5xx (default: 0)')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help='Share of requests answered 429 (default: 0)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the injected faults (default: 0)')
+    parser.add_argument('--rate', type=float, default=100.0, help='Token bucket rate for both runs (default: 100)')
+    parser.add_argument('--batch-size', type=int, default=1, help='DOIs per request (default: 1)')
+    args = parser.parse_args()
+
+    publications, works = make_library(args.n)
+    store = WorkStore(list(works.values()))
+    faults = Faults(latency=args.latency, throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                    retry_after=0, max_in_flight=args.server_limit, seed=args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        (workdir / 'library.json').write_text(json.dumps(publications))
+
+        common = {'batch_size': args.batch_size, 'rate': args.rate}
+        runs = {
+            'Sequential:': run(workdir, 'sequential', store, faults, concurrency=1, max_concurrency=1, **common),
+            f'Start at {args.concurrency}:': run(workdir, 'concurrent', store, faults, concurrency=args.concurrency,
+                                                   max_concurrency=args.concurrency, **common),
+            'Start at 1:': run(workdir, 'adaptive', store, faults, concurrency=1,
+                                                  max_concurrency=args.concurrency, **common),
+        }
+
+    limit = f", server limit {args.server_limit} in flight" if args.server_limit else ''
+    if args.error_rate or args.throttle_rate:
+        limit += f", {args.error_rate:.0%} errors, {args.throttle_rate:.0%} throttled (seed {args.seed})"
+    print(f"{args.n} DOIs, {args.latency * 1000:.0f} ms latency, batch size {args.batch_size}, rate {args.rate:g}/s{limit}")
+    seq = runs['Sequential:']
+    for label, result in runs.items():
+        print(f"  {label:<20} {result[0]:7.2f}s  {result[1]:5d} requests  {result[2]:4d} throttled  "
+              f"{seq[0] / result[0]:5.1f}x")
+    identical = all(result[3:] == seq[3:] for result in runs.values())
+    print(f"  Identical output and cache: {'yes' if identical else 'NO'}")
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
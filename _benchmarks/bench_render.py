@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark markdown vs HTML output of generate_papers_md.py, including the Jekyll build.
+
+Scales up the Zotero export to a long synthetic list, renders it both ways and,
+if Jekyll is installed, times `jekyll build` of a minimal site holding each
+version. The markdown page goes through kramdown; the HTML version is pasted in
+from _includes/ and skips it.
+
+Usage:
+  python _benchmarks/bench_render.py                  # papers_zotero.json x 50
+  python _benchmarks/bench_render.py --copies 200     # Longer list
+  python _benchmarks/bench_render.py --jekyll "bundle exec jekyll"
+"""
+
+import argparse
+import json
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import generate_papers_md  # noqa: E402
+from csl_json import RENDER_FIELDS, load_publications  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+SITE_CONFIG = "markdown: kramdown\n"
+PAGE_LAYOUT = "<html><body>{{ content }}</body></html>\n"
+
+
+def make_library(input_path: Path, copies: int, output: Path) -> int:
+    """Write `copies` copies of the export with distinct citation keys and entry numbers."""
+    records = json.loads(input_path.read_text(encoding='utf-8'))
+    library = []
+    for n in range(copies):
+        for record in records:
+            record = dict(record)
+            key = record.get('citation-key') or record.get('id') or ''
+            record['citation-key'] = record['id'] = f"{key}-{n}"
+            # Let group_publications number every entry
+            record.pop('note', None)
+            library.append(record)
+    output.write_text(json.dumps(library), encoding='utf-8')
+    return len(library)
+
+
+def render(library: Path, site: Path, fmt: str) -> float:
+    """Generate papers.md (and its include) into a fresh site; return seconds."""
+    if site.exists():
+        shutil.rmtree(site)
+    (site / '_layouts').mkdir(parents=True)
+    (site / '_config.yml').write_text(SITE_CONFIG)
+    (site / '_layouts' / 'page.html').write_text(PAGE_LAYOUT)
+
+    config = dict(generate_papers_md.DEFAULT_CONFIG, format=fmt)
+    output = site / 'papers.md'
+    start = time.perf_counter()
+    publications = load_publications(str(library), RENDER_FIELDS)
+    pages = generate_papers_md.generate_pages(publications, config, str(output))
+    elapsed = time.perf_counter() - start
+
+    for path, content in pages.items():
+        # Include paths are relative to the site root
+        target = Path(path) if Path(path).is_absolute() else site / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding='utf-8')
+    return elapsed
+
+
+def build(jekyll: list[str], site: Path) -> float:
+    """Time one `jekyll build` of a site."""
+    start = time.perf_counter()
+    subprocess.run(jekyll + ['build', '--quiet', '-s', str(site), '-d', str(site / '_site')],
+                   check=True, cwd=site)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark markdown vs HTML papers output.')
+    parser.add_argument('-i', '--input', default=str(ROOT / 'papers_zotero.json'),
+                        help='CSL-JSON export to scale up (default: papers_zotero.json)')
+    parser.add_argument('--copies', type=int, default=50, help='Copies of the export (default: 50)')
+    parser.add_argument('--jekyll', default='jekyll', help='Jekyll command (default: jekyll)')
+    parser.add_argument('--runs', type=int, default=3, help='Builds per format; the fastest counts (default: 3)')
+    args = parser.parse_args()
+
+    jekyll = shlex.split(args.jekyll)
+    has_jekyll = shutil.which(jekyll[0]) is not None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        library = workdir / 'library.json'
+        entries = make_library(Path(args.input), args.copies, library)
+        print(f"{entries} entries")
+
+        for fmt in ('markdown', 'html'):
+            site = workdir / fmt
+            seconds = render(library, site, fmt)
+            size = sum(p.stat().st_size for p in site.rglob('*') if p.is_file() and p.suffix in ('.md', '.html'))
+            line = f"  {fmt + ':':<10} render {seconds:6.2f}s  ({size / 1024:.0f} KB)"
+            if has_jekyll:
+                line += f"  jekyll build {min(build(jekyll, site) for _ in range(args.runs)):6.2f}s"
+            print(line)
+
+        if not has_jekyll:
+            print(f"  '{jekyll[0]}' not found; skipped Jekyll build timing (use --jekyll to point at it)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAlex works API, for benchmarks and resilience tests.
+
+Replays works recorded in openalex_cache.json and _archive/phase1_cache.json
+(and any --record file) so enrich_from_openalex.py, papers_pipeline.py and the
+archived verify_publications.py can run offline against a server that behaves
+the same way every time. It answers the requests those scripts make:
+
+  /works/doi:X, /works/https://doi.org/X, /works/W123     One work, or 404
+  /works?filter=doi:a|b|c                                 Batch DOI lookup
+  /works?filter=title.search:...,author.search:...,publication_year:...,type:...
+  /works?filter=author.id:...&cursor=*                    Every recorded work, paged
+
+Cached "not found" DOIs answer 404. The caches don't record authorships, so
+an author filter returns every work; they are one researcher's library anyway.
+
+Faults are injected per request: latency (plus random jitter), a share of
+429s with Retry-After, of 5xx errors and of requests that hang until the
+client times out, 429s above a number of requests in flight, and an
+X-RateLimit-Remaining budget. Each fault is drawn from --seed, the request
+path and how many times that path has been requested, so a run sees the same
+faults whatever the thread timing, and retries of a request can succeed.
+
+With --record FILE, requests the recordings can't answer are passed through
+to the real API, and the works it returns are added to FILE for later replay.
+
+Usage:
+  python _benchmarks/openalex_standin.py                            # Replay on port 8765
+  python _benchmarks/openalex_standin.py --latency 0.2 --jitter 0.1
+  python _benchmarks/openalex_standin.py --throttle-rate 0.1 --error-rate 0.05
+  python _benchmarks/openalex_standin.py --timeout-rate 0.05 --hang 40
+  python _benchmarks/openalex_standin.py --max-in-flight 3          # 429 above 3 concurrent requests
+  python _benchmarks/openalex_standin.py --record recorded_works.json
+
+Then point the scripts at it:
+  python enrich_from_openalex.py --api-base http://127.0.0.1:8765 --refresh
+  OPENALEX_API_BASE=http://127.0.0.1:8765 python papers_pipeline.py update --force
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import NamedTuple, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from csl_json import canonical_doi  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+
+DEFAULT_PORT = 8765
+DEFAULT_SOURCES = (ROOT / 'openalex_cache.json', ROOT / '_archive' / 'phase1_cache.json')
+UPSTREAM = "https://api.openalex.org"
+PER_PAGE = 25  # OpenAlex default page size
+MAX_PER_PAGE = 200
+ERROR_STATUSES = (500, 502, 503)
+
+_WORD = re.compile(r'[^\W_]+')
+
+
+class Faults(NamedTuple):
+    """What to inject into responses (all off by default)."""
+    latency: float = 0.0  # seconds added to every response
+    jitter: float = 0.0  # up to this many more seconds, drawn per request
+    throttle_rate: float = 0.0  # share of requests answered 429
+    error_rate: float = 0.0  # share answered 500/502/503
+    timeout_rate: float = 0.0  # share that hang for `hang` seconds and get no response
+    hang: float = 60.0
+    retry_after: float = 1.0  # Retry-After sent with 429s
+    max_in_flight: int = 0  # 429 above this many concurrent requests (0 = no limit)
+    daily_limit: int = 0  # requests allowed before every answer is 429 (0 = no limit)
+    seed: int = 0
+
+
+def words(text: Optional[str]) -> set[str]:
+    """Lowercase words of a title or search string."""
+    return set(_WORD.findall((text or '').casefold()))
+
+
+def work_from_cache_entry(doi: str, entry: dict) -> dict:
+    """Rebuild the OpenAlex fields enrich_from_openalex.py keeps in its cache."""
+    return {
+        'id': entry.get('openalex_id'),
+        'doi': f"https://doi.org/{doi}",
+        'cited_by_count': entry.get('cited_by_count', 0),
+        'open_access': entry.get('open_access') or {},
+    }
+
+
+def work_from_phase1(metadata: dict) -> dict:
+    """Rebuild a work from verify_publications.extract_openalex_metadata output."""
+    work = {
+        'id': metadata.get('openalex_id'),
+        'doi': f"https://doi.org/{metadata['doi']}" if metadata.get('doi') else None,
+        'title': metadata.get('title'),
+        'display_name': metadata.get('title'),
+        'publication_year': metadata.get('publication_year'),
+        'type': metadata.get('type'),
+        'cited_by_count': metadata.get('cited_by_count', 0),
+        'authorships': [{'author': {'display_name': name}} for name in metadata.get('authors') or []],
+        'primary_location': {'source': {'display_name': metadata['journal']}} if metadata.get('journal') else None,
+        'biblio': {key: metadata.get(key) for key in ('volume', 'issue', 'first_page', 'last_page')},
+        'open_access': {'is_oa': metadata.get('is_oa', False), 'oa_url': metadata.get('oa_url')},
+    }
+    if metadata.get('oa_url'):
+        work['best_oa_location'] = {'landing_page_url': metadata['oa_url']}
+    return work
+
+
+class WorkStore:
+    """
+    Recorded works, by canonical DOI and OpenAlex ID.
+
+    Reads the OpenAlex cache ({doi: entry}), phase 1 caches (a list of
+    publications with an 'openalex' match) and recordings (a list of works).
+    Phase 1 matches only fill in fields the others lack: the cache's citation
+    counts and "not found" DOIs are newer, and so are recordings.
+    """
+
+    def __init__(self, works: Optional[list[dict]] = None):
+        self.lock = threading.Lock()
+        self.works = []
+        self.by_doi = {}
+        self.by_id = {}
+        self.missing = set()  # DOIs cached as "not found"
+        for work in works or []:
+            self.add(work)
+
+    def add(self, work: dict, prefer: bool = False):
+        """Add a work, merging it with a recorded one with the same DOI or ID."""
+        doi = canonical_doi(work['doi']) if work.get('doi') else None
+        openalex_id = (work.get('id') or '').rsplit('/', 1)[-1]
+        with self.lock:
+            existing = self.by_doi.get(doi) if doi else None
+            existing = existing or self.by_id.get(openalex_id)
+            if existing is None:
+                existing = {}
+                self.works.append(existing)
+            for key, value in work.items():
+                if prefer or existing.get(key) is None:
+                    existing[key] = value
+            if doi:
+                self.by_doi[doi] = existing
+                if prefer:
+                    self.missing.discard(doi)
+            if existing.get('id'):
+                self.by_id[existing['id'].rsplit('/', 1)[-1]] = existing
+
+    def load(self, path: Path) -> int:
+        """Add the works in a cache or recording file; returns how many."""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        count = 0
+        if isinstance(data, dict):
+            for doi, entry in data.items():
+                if entry is None or entry.get('not_found') or not entry.get('openalex_id'):
+                    self.missing.add(canonical_doi(doi))
+                    continue
+                self.add(work_from_cache_entry(canonical_doi(doi), entry), prefer=True)
+                count += 1
+            return count
+        for record in data:
+            if 'openalex' in record:
+                if record['openalex']:
+                    self.add(work_from_phase1(record['openalex']))
+                    count += 1
+            else:
+                self.add(record, prefer=True)
+                count += 1
+        return count
+
+    def get(self, key: str) -> Optional[dict]:
+        """A work by OpenAlex ID (W123 or its URL) or DOI (bare, doi: or URL)."""
+        key = unquote(key)
+        openalex_id = key.rstrip('/').rsplit('/', 1)[-1]
+        if re.fullmatch(r'W\d+', openalex_id):
+            return self.by_id.get(openalex_id)
+        doi = canonical_doi(key)
+        return None if doi in self.missing else self.by_doi.get(doi)
+
+    def search(self, filters: dict) -> tuple[list[dict], bool]:
+        """
+        Works matching an OpenAlex filter string's parts.
+
+        Returns:
+            (matching works, whether the recordings could answer every part)
+        """
+        # A DOI cached as "not found" is not found by any filter, as with get()
+        results = [w for w in self.works if canonical_doi(w.get('doi') or '') not in self.missing]
+        complete = True
+        for name, value in filters.items():
+            if name == 'doi':
+                dois = [canonical_doi(doi) for doi in value.split('|')]
+                results = [self.by_doi[doi] for doi in dois if doi in self.by_doi and doi not in self.missing]
+                complete = all(doi in self.by_doi or doi in self.missing for doi in dois)
+            elif name == 'title.search':
+                wanted = words(value)
+                results = [w for w in results if wanted <= words(w.get('title'))]
+            elif name == 'author.search':
+                wanted = words(value)
+                results = [w for w in results if any(
+                    wanted <= words(a.get('author', {}).get('display_name')) for a in w.get('authorships') or [])]
+            elif name == 'publication_year':
+                results = [w for w in results if str(w.get('publication_year')) == value]
+            elif name == 'type':
+                results = [w for w in results if w.get('type') == value]
+            # author.id/author.orcid and anything else: every recorded work passes
+        if set(filters) & {'title.search', 'author.search'} and not results:
+            complete = False
+        return results, complete
+
+    def save(self, path: Path):
+        """Write every work to a recording file (temp file + rename)."""
+        with self.lock:
+            data = json.dumps(self.works, ensure_ascii=False, indent=1)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(data, encoding='utf-8')
+        tmp.replace(path)
+
+
+def parse_filter(text: str) -> dict:
+    """Split an OpenAlex filter parameter ("a:x,b:y") into {name: value}."""
+    filters = {}
+    for part in text.split(','):
+        name, _, value = part.partition(':')
+        if name:
+            filters[name.strip()] = value.strip()
+    return filters
+
+
+def select_fields(work: dict, select: Optional[str]) -> dict:
+    """Apply a select= parameter."""
+    if not select:
+        return work
+    return {key: work.get(key) for key in select.split(',')}
+
+
+def start_server(store: WorkStore, faults: Faults = Faults(), port: int = 0, host: str = '127.0.0.1',
+                 record: Optional[Path] = None) -> tuple[ThreadingHTTPServer, dict]:
+    """
+    Serve `store` in a background thread.
+
+    Args:
+        store: Works to replay
+        faults: Faults to inject
+        port: Port to listen on (0 = any free port; see server.server_port)
+        record: Pass requests the store can't answer to the real API and save its works here
+
+    Returns:
+        (server, counts), counts being live totals: requests, ok, not_found,
+        throttled, errors, timeouts, recorded and peak_in_flight
+    """
+    counts = {'requests': 0, 'ok': 0, 'not_found': 0, 'throttled': 0, 'errors': 0, 'timeouts': 0,
+              'recorded': 0, 'in_flight': 0, 'peak_in_flight': 0}
+    attempts = {}
+    lock = threading.Lock()
+    upstream = requests.Session()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; with Nagle on, the body waits
+        # for the client's delayed ACK (~40 ms) on every keep-alive request
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status: int, body: Optional[dict], headers: Optional[dict] = None):
+            data = json.dumps(body).encode() if body is not None else b''
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            with lock:
+                counts['requests'] += 1
+                counts['in_flight'] += 1
+                counts['peak_in_flight'] = max(counts['peak_in_flight'], counts['in_flight'])
+                in_flight = counts['in_flight']
+                attempt = attempts[self.path] = attempts.get(self.path, 0) + 1
+                served = counts['requests']
+            # Same faults for the same request every run, whatever the thread timing
+            rng = random.Random(f"{faults.seed}:{url.path}?{url.query}:{attempt}")
+            try:
+                time.sleep(faults.latency + rng.uniform(0, faults.jitter))
+                headers = {}
+                if faults.daily_limit:
+                    headers['X-RateLimit-Remaining'] = str(max(0, faults.daily_limit - served))
+                roll = rng.random()
+                if roll < faults.timeout_rate:
+                    with lock:
+                        counts['timeouts'] += 1
+                    time.sleep(faults.hang)
+                    self.close_connection = True
+                    return
+                roll -= faults.timeout_rate
+                over_limit = faults.daily_limit and served > faults.daily_limit
+                if over_limit or roll < faults.throttle_rate or (faults.max_in_flight and in_flight > faults.max_in_flight):
+                    with lock:
+                        counts['throttled'] += 1
+                    headers['Retry-After'] = f"{faults.retry_after:g}"
+                    return self.send_json(429, {'error': 'Too many requests'}, headers)
+                roll -= faults.throttle_rate
+                if roll < faults.error_rate:
+                    with lock:
+                        counts['errors'] += 1
+                    return self.send_json(rng.choice(ERROR_STATUSES), {'error': 'Injected error'}, headers)
+                status, body = self.answer(url)
+                with lock:
+                    counts['ok' if status == 200 else 'not_found'] += 1
+                self.send_json(status, body, headers)
+            finally:
+                with lock:
+                    counts['in_flight'] -= 1
+
+        def answer(self, url) -> tuple[int, dict]:
+            query = parse_qs(url.query)
+            if url.path.startswith('/works/'):
+                key = unquote(url.path[len('/works/'):])
+                work = store.get(key)
+                if work is None and record and canonical_doi(key) not in store.missing:
+                    return self.pass_through(url)
+                if work is None:
+                    return 404, {'error': 'Not found'}
+                return 200, select_fields(work, query.get('select', [None])[0])
+            if url.path != '/works':
+                return 404, {'error': 'Not found'}
+
+            results, complete = store.search(parse_filter(query.get('filter', [''])[0]))
+            if not complete and record:
+                return self.pass_through(url)
+
+            per_page = min(int(query.get('per-page', [PER_PAGE])[0]), MAX_PER_PAGE)
+            cursor = query.get('cursor', [None])[0]
+            if cursor is not None:
+                start = 0 if cursor == '*' else int(cursor)
+            else:
+                start = (int(query.get('page', ['1'])[0]) - 1) * per_page
+            page = results[start:start + per_page]
+            more = start + per_page < len(results)
+            meta = {'count': len(results), 'per_page': per_page,
+                    'next_cursor': str(start + per_page) if cursor is not None and more else None}
+            select = query.get('select', [None])[0]
+            return 200, {'meta': meta, 'results': [select_fields(w, select) for w in page]}
+
+        def pass_through(self, url) -> tuple[int, dict]:
+            """Ask the real API and keep any works it returns."""
+            try:
+                response = upstream.get(f"{UPSTREAM}{url.path}?{url.query}", timeout=30)
+            except requests.RequestException as e:
+                return 502, {'error': f"Upstream request failed: {e}"}
+            try:
+                body = response.json()
+            except ValueError:
+                return response.status_code, {'error': response.text[:200]}
+            if response.status_code == 200:
+                works = body.get('results', [body]) if 'results' in body else [body]
+                for work in works:
+                    if work.get('id'):
+                        store.add(work, prefer=True)
+                with lock:
+                    counts['recorded'] += len(works)
+                store.save(record)
+            return response.status_code, body
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, counts
+
+
+def describe(counts: dict) -> str:
+    """One-line summary of what the server answered."""
+    return (f"{counts['requests']} requests: {counts['ok']} ok, {counts['not_found']} not found, "
+            f"{counts['throttled']} throttled, {counts['errors']} errors, {counts['timeouts']} timed out, "
+            f"{counts['recorded']} works recorded (peak {counts['peak_in_flight']} in flight)")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Local OpenAlex stand-in replaying recorded works, with fault injection.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python _benchmarks/openalex_standin.py
+  python _benchmarks/openalex_standin.py --latency 0.1 --throttle-rate 0.1 --seed 7
+  python _benchmarks/openalex_standin.py --timeout-rate 0.05 --hang 40
+  python _benchmarks/openalex_standin.py --source my_cache.json --record recorded_works.json
+        """
+    )
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--source', action='append', metavar='FILE',
+                        help='Cache or recording to replay; repeat for several '
+                             '(default: openalex_cache.json and _archive/phase1_cache.json)')
+    parser.add_argument('--record', metavar='FILE',
+                        help=f'Pass requests the recordings can\'t answer to {UPSTREAM} and save its works to FILE '
+                             '(replayed too, if it exists)')
+    parser.add_argument('--latency', type=float, default=0.0, metavar='SECONDS', help='Added to every response')
+    parser.add_argument('--jitter', type=float, default=0.0, metavar='SECONDS',
+                        help='Up to this much more latency, drawn per request')
+    parser.add_argument('--throttle-rate', type=float, default=0.0, metavar='SHARE', help='Share of requests answered 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, metavar='SHARE',
+                        help='Share of requests answered 500, 502 or 503')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, metavar='SHARE',
+                        help='Share of requests that hang for --hang seconds, then close without a response')
+    parser.add_argument('--hang', type=float, default=60.0, metavar='SECONDS', help='How long those hang (default: 60)')
+    parser.add_argument('--retry-after', type=float, default=1.0, metavar='SECONDS',
+                        help='Retry-After sent with 429s (default: 1)')
+    parser.add_argument('--max-in-flight', type=int, default=0, metavar='N',
+                        help='Answer 429 above N concurrent requests (default: no limit)')
+    parser.add_argument('--daily-limit', type=int, default=0, metavar='N',
+                        help='Send X-RateLimit-Remaining and answer 429 after N requests (default: no limit)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the injected faults (default: 0)')
+    args = parser.parse_args()
+
+    if args.throttle_rate + args.error_rate + args.timeout_rate > 1:
+        print("Error: --throttle-rate, --error-rate and --timeout-rate add up to more than 1", file=sys.stderr)
+        return 1
+
+    store = WorkStore()
+    sources = [Path(path) for path in args.source] if args.source else list(DEFAULT_SOURCES)
+    if args.record and Path(args.record).exists():
+        sources.append(Path(args.record))
+    for path in sources:
+        if not path.exists():
+            print(f"Error: Recording not found: {path}", file=sys.stderr)
+            return 1
+        print(f"  {store.load(path)} works from {path}")
+    print(f"Replaying {len(store.works)} works ({len(store.missing)} DOIs not found)")
+
+    faults = Faults(args.latency, args.jitter, args.throttle_rate, args.error_rate, args.timeout_rate,
+                    args.hang, args.retry_after, args.max_in_flight, args.daily_limit, args.seed)
+    server, counts = start_server(store, faults, args.port, args.host, Path(args.record) if args.record else None)
+    print(f"Listening on http://{args.host}:{server.server_port} (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+    print(f"\n{describe(counts)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
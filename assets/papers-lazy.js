@@ -0,0 +1,64 @@
+// Lazy-loaded year sections for the papers page.
+//
+// Loaded by _layouts/page.html on pages with `lazy_years` in their front
+// matter (generate_papers_md.py --lazy-years). Older years are collapsed
+// <details> whose entries are fetched from data-src the first time they are
+// opened. Links to #entry-N in a collapsed year open and load it, then scroll
+// to the entry, so deep links keep working.
+(function () {
+  var sections = document.querySelectorAll('details[data-src]');
+  if (!sections.length) return;
+
+  function load(details) {
+    if (!details._loading) {
+      details._loading = fetch(details.getAttribute('data-src'))
+        .then(function (response) {
+          if (!response.ok) throw new Error(response.status);
+          return response.text();
+        })
+        .then(function (html) {
+          // Replace the fallback link with the entries
+          var fallback = details.querySelector('summary ~ p');
+          if (fallback) details.removeChild(fallback);
+          details.insertAdjacentHTML('beforeend', html);
+          document.dispatchEvent(new CustomEvent('papers:loaded', { detail: details }));
+        })
+        .catch(function () {
+          // Leave the fallback link; it opens the fragment itself
+          details._loading = null;
+        });
+    }
+    return details._loading;
+  }
+
+  // Section holding entry `n`, from its list of entry numbers
+  function sectionOf(n) {
+    for (var i = 0; i < sections.length; i++) {
+      if ((' ' + sections[i].getAttribute('data-entries') + ' ').indexOf(' ' + n + ' ') !== -1) {
+        return sections[i];
+      }
+    }
+    return null;
+  }
+
+  function followHash() {
+    var match = /^#entry-(\d+)$/.exec(location.hash);
+    if (!match || document.getElementById('entry-' + match[1])) return;
+    var details = sectionOf(match[1]);
+    if (!details) return;
+    details.open = true;
+    load(details).then(function () {
+      var entry = document.getElementById('entry-' + match[1]);
+      if (entry) entry.scrollIntoView();
+    });
+  }
+
+  Array.prototype.forEach.call(sections, function (details) {
+    details.addEventListener('toggle', function () {
+      if (details.open) load(details);
+    });
+  });
+
+  window.addEventListener('hashchange', followHash);
+  followHash();
+})();
@@ -0,0 +1,169 @@
+// Search box for the papers page.
+//
+// Loaded by _layouts/page.html on pages with `search_index` in their front
+// matter (generate_papers_md.py --search-index). The index is only fetched
+// once the visitor starts typing; after that every keystroke filters the
+// entries on the page locally. See papers_search.py for the index format.
+(function () {
+  var script = document.currentScript;
+  var indexUrl = script.getAttribute('data-index');
+  var content = document.querySelector('.post-content');
+  if (!indexUrl || !content) return;
+
+  var input = document.createElement('input');
+  input.type = 'search';
+  input.placeholder = 'Search by title, author, journal or year';
+  input.setAttribute('aria-label', 'Search papers');
+  input.style.width = '100%';
+  input.style.marginBottom = '0.5em';
+  var status = document.createElement('p');
+  status.setAttribute('aria-live', 'polite');
+  content.insertBefore(status, content.firstChild);
+  content.insertBefore(input, status);
+
+  // Entry paragraphs start with "[N]", in both markdown and --format html output
+  var paragraphs = {};
+  function findParagraphs() {
+    Array.prototype.forEach.call(content.querySelectorAll('p'), function (p) {
+      var match = /^\s*\[(\d+)\]/.exec(p.textContent);
+      if (match) paragraphs[match[1]] = p;
+    });
+  }
+  findParagraphs();
+  var headings = content.querySelectorAll('h3');
+  // Collapsed years of --lazy-years pages (see papers-lazy.js)
+  var lazySections = content.querySelectorAll('details[data-src]');
+
+  var index = null;
+  var tokens = [];
+  var rows = [];
+  var loading = null;
+
+  // Undo papers_search.front_code and encode_rows
+  function decode(data) {
+    var previous = '';
+    data.tokens.split(' ').forEach(function (coded) {
+      previous = previous.slice(0, +coded[0]) + coded.slice(1);
+      tokens.push(previous);
+    });
+    rows = data.rows.map(function (encoded) {
+      if (typeof encoded === 'number') return [encoded];
+      for (var i = 1; i < encoded.length; i++) encoded[i] += encoded[i - 1];
+      return encoded;
+    });
+    index = data;
+  }
+
+  function load() {
+    if (!loading) {
+      loading = fetch(indexUrl)
+        .then(function (response) { return response.json(); })
+        .then(decode);
+    }
+    return loading;
+  }
+
+  // Must match papers_search.normalise
+  function normalise(text) {
+    return text.toLowerCase().replace(/ß/g, 'ss').replace(/ς/g, 'σ')
+      .normalize('NFKD').replace(/\p{M}/gu, '');
+  }
+
+  // Rows of entries with a token starting with `prefix` (tokens are sorted)
+  function prefixRows(prefix) {
+    var lo = 0, hi = tokens.length;
+    while (lo < hi) {
+      var mid = (lo + hi) >> 1;
+      if (tokens[mid] < prefix) lo = mid + 1; else hi = mid;
+    }
+    var found = {};
+    for (var i = lo; i < tokens.length && tokens[i].lastIndexOf(prefix, 0) === 0; i++) {
+      rows[i].forEach(function (row) { found[row] = true; });
+    }
+    return found;
+  }
+
+  function search(query) {
+    var words = normalise(query).match(/[\p{L}\p{N}]+/gu) || [];
+    if (!words.length) return null;
+    var matched = prefixRows(words[0]);
+    words.slice(1).forEach(function (word) {
+      var found = prefixRows(word);
+      Object.keys(matched).forEach(function (row) {
+        if (!found[row]) delete matched[row];
+      });
+    });
+    return matched;
+  }
+
+  function setVisible(element, visible) {
+    element.style.display = visible ? '' : 'none';
+  }
+
+  function apply() {
+    var matched = search(input.value);
+    var shown = 0, total = 0, elsewhere = {};
+    index.entries.forEach(function (entry, row) {
+      var p = paragraphs[entry[0]];
+      var hit = !matched || matched[row];
+      if (p) {
+        total++;
+        if (hit) shown++;
+        setVisible(p, hit);
+      } else if (hit && matched) {
+        var page = index.pages[entry[2]];
+        elsewhere[page] = (elsewhere[page] || 0) + 1;
+      }
+    });
+
+    // Hide year headings with no visible entries below them
+    Array.prototype.forEach.call(headings, function (h) {
+      var visible = false;
+      for (var el = h.nextElementSibling; el && el.tagName !== 'H3'; el = el.nextElementSibling) {
+        if (el.tagName === 'P' && el.style.display !== 'none' && /^\s*\[\d+\]/.test(el.textContent)) {
+          visible = true;
+          break;
+        }
+      }
+      setVisible(h, !matched || visible);
+    });
+
+    // Hide loaded years with no visible entries
+    Array.prototype.forEach.call(lazySections, function (details) {
+      var visible = Array.prototype.some.call(details.querySelectorAll('p[id^="entry-"]'), function (p) {
+        return p.style.display !== 'none';
+      });
+      setVisible(details, !matched || visible || !details.querySelector('p[id^="entry-"]'));
+    });
+
+    status.textContent = '';
+    if (!matched) return;
+    var pages = Object.keys(elsewhere);
+    if (total) {
+      status.appendChild(document.createTextNode(shown + ' of ' + total + ' papers match'));
+    } else if (!pages.length) {
+      status.appendChild(document.createTextNode('No papers match'));
+    }
+    if (pages.length) {
+      status.appendChild(document.createTextNode(total ? '; more on ' : 'Matches on '));
+      pages.forEach(function (page, i) {
+        var link = document.createElement('a');
+        link.href = page;
+        link.textContent = page.replace(/\/$/, '').split('/').pop() + ' (' + elsewhere[page] + ')';
+        if (i) status.appendChild(document.createTextNode(', '));
+        status.appendChild(link);
+      });
+    }
+  }
+
+  input.addEventListener('input', function () {
+    // Searching needs every entry on the page, so open (and load) the collapsed years
+    Array.prototype.forEach.call(lazySections, function (details) { details.open = true; });
+    load().then(apply);
+  });
+
+  document.addEventListener('papers:loaded', function () {
+    findParagraphs();
+    if (index) apply();
+  });
+})();
@@ -0,0 +1,254 @@
+"""
+CSL-JSON loading and the publication record shared by the pipeline scripts.
+
+Better BibTeX exports carry every Zotero field, including multi-kilobyte
+abstracts, but each pipeline stage only reads a handful of them. iter_csl_json
+decodes the export one record at a time and keeps only the requested fields, so
+memory use scales with what a stage needs rather than with the size of the file.
+
+load_publications goes one step further and turns each record into an immutable
+Publication with its year, entry number, authors and DOI parsed once up front.
+"""
+
+import json
+import re
+from typing import Iterable, Iterator, NamedTuple, Optional
+from urllib.parse import unquote
+
+CHUNK_SIZE = 1 << 16  # characters read per refill
+
+# Fields each stage reads
+RENDER_FIELDS = (
+    'id', 'citation-key', 'author', 'issued', 'title', 'container-title', 'volume',
+    'issue', 'page', 'DOI', 'URL', 'note', 'citation-count',
+)
+ENRICH_FIELDS = ('id', 'citation-key', 'title', 'DOI', 'URL')
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+_DOI_PREFIX = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:)\s*', re.IGNORECASE)
+
+
+def canonical_doi(doi: str) -> str:
+    """
+    Canonical form of a DOI, used wherever DOIs are keys (OpenAlex cache, index).
+
+    URL-decoded, without surrounding whitespace or a doi.org / doi: prefix, and
+    lowercase, since DOIs are case-insensitive: "https://doi.org/10.1093/AJE/kwv347 "
+    and "10.1093/aje/kwv347" are the same key.
+    """
+    return _DOI_PREFIX.sub('', unquote(doi.strip())).strip().lower()
+
+
+def enrichment_key(pub: dict) -> str:
+    """Key a publication's entry in the enrichment sidecar (citation key, else id, else DOI)."""
+    return pub.get('citation-key') or pub.get('id') or pub.get('DOI') or ''
+
+
+def extract_entry_number(pub: dict) -> Optional[int]:
+    """Extract entry number from the note field."""
+    note = pub.get('note', '')
+    match = re.search(r'Original entry:\s*\[(\d+)\]', note)
+    if match:
+        return int(match.group(1))
+    return None
+
+
+def get_year(pub: dict) -> Optional[int]:
+    """Extract publication year from CSL-JSON issued field."""
+    issued = pub.get('issued', {})
+    date_parts = issued.get('date-parts', [[]])
+    if date_parts and date_parts[0]:
+        return date_parts[0][0]
+    return None
+
+
+def format_author_name(author: dict) -> str:
+    """Format a single author from CSL-JSON format."""
+    # Handle literal names (e.g., consortiums, working groups)
+    if 'literal' in author:
+        return author['literal']
+
+    given = author.get('given', '')
+    family = author.get('family', '')
+
+    if given and family:
+        return f"{given} {family}"
+    elif family:
+        return family
+    elif given:
+        return given
+    return "Unknown"
+
+
+class Author(NamedTuple):
+    """Display name, family name (for highlighting) and given names of one author."""
+    name: str
+    family: str
+    given: str
+
+
+# One shared Author per distinct CSL name; co-authors repeat across a library
+_authors = {}
+
+
+def parse_author(author: dict) -> Author:
+    """Parse a CSL-JSON author once, reusing the result for repeated names."""
+    key = (author.get('literal'), author.get('given'), author.get('family'))
+    parsed = _authors.get(key)
+    if parsed is None:
+        parsed = _authors[key] = Author(format_author_name(author), author.get('family', ''),
+                                        author.get('given', ''))
+    return parsed
+
+
+class Publication(NamedTuple):
+    """
+    Immutable, pre-parsed publication record.
+
+    Tuple-backed, so much smaller than the source dict, and derived fields are
+    computed once in from_csl. Use _replace() to add enrichment or an entry number.
+    """
+    key: str
+    doi: Optional[str]
+    title: Optional[str]
+    year: Optional[int]
+    entry_num: Optional[int]
+    authors: tuple
+    container_title: Optional[str]
+    volume: Optional[str]
+    issue: Optional[str]
+    page: Optional[str]
+    url: Optional[str]
+    citation_count: Optional[int]
+
+    @classmethod
+    def from_csl(cls, record: dict) -> 'Publication':
+        """Build a Publication from a (possibly projected) CSL-JSON record."""
+        return cls(
+            key=enrichment_key(record),
+            doi=record.get('DOI'),
+            title=record.get('title'),
+            year=get_year(record),
+            entry_num=extract_entry_number(record),
+            authors=tuple(map(parse_author, record.get('author') or ())),
+            container_title=record.get('container-title'),
+            volume=record.get('volume'),
+            issue=record.get('issue'),
+            page=record.get('page'),
+            url=record.get('URL'),
+            citation_count=record.get('citation-count'),
+        )
+
+
+def _skip_whitespace(buf: str, pos: int) -> int:
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def _encoded_size(value) -> int:
+    # Strings (abstracts, notes) dominate; count their characters rather than re-encoding them
+    if isinstance(value, str):
+        return len(value) + 2
+    return len(json.dumps(value, ensure_ascii=False))
+
+
+def iter_csl_json(filepath: str, fields: Optional[Iterable[str]] = None,
+                  stats: Optional[dict] = None) -> Iterator[dict]:
+    """
+    Yield the records of a CSL-JSON array one at a time.
+
+    Args:
+        filepath: CSL-JSON file (a top-level array of objects)
+        fields: Keep only these fields of each record (None = keep all)
+        stats: If given, filled with 'records', 'bytes_read' and 'bytes_skipped'
+            (the approximate encoded size of the dropped field values)
+    """
+    keep = frozenset(fields) if fields is not None else None
+    if stats is not None:
+        stats.update(records=0, bytes_read=0, bytes_skipped=0)
+
+    with open(filepath, 'r', encoding='utf-8') as f:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def refill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                eof = True
+                return False
+            if stats is not None:
+                stats['bytes_read'] += len(chunk.encode('utf-8'))
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def next_char() -> str:
+            nonlocal pos
+            pos = _skip_whitespace(buf, pos)
+            while pos >= len(buf) and refill():
+                pos = _skip_whitespace(buf, pos)
+            return buf[pos] if pos < len(buf) else ''
+
+        if next_char() != '[':
+            raise ValueError("CSL-JSON file should contain an array of publications")
+        pos += 1
+
+        first = True
+        while True:
+            char = next_char()
+            if char == ']':
+                return
+            if not first:
+                if char != ',':
+                    raise ValueError(f"Malformed CSL-JSON array in {filepath}")
+                pos += 1
+                next_char()
+            first = False
+
+            while True:
+                try:
+                    record, end = _decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError:
+                    # Record runs past the buffer; read more and retry
+                    if eof or not refill():
+                        raise
+            pos = end
+
+            if not isinstance(record, dict):
+                raise ValueError("CSL-JSON file should contain an array of publications")
+
+            if keep is not None:
+                dropped = [k for k in record if k not in keep]
+                if stats is not None:
+                    stats['bytes_skipped'] += sum(_encoded_size(record[k]) for k in dropped)
+                for k in dropped:
+                    del record[k]
+
+            if stats is not None:
+                stats['records'] += 1
+            yield record
+
+
+def load_csl_json(filepath: str, fields: Optional[Iterable[str]] = None,
+                  stats: Optional[dict] = None) -> list[dict]:
+    """Load a CSL-JSON file, keeping only `fields` of each record."""
+    return list(iter_csl_json(filepath, fields, stats))
+
+
+def load_publications(filepath: str, fields: Optional[Iterable[str]] = None,
+                      stats: Optional[dict] = None) -> list[Publication]:
+    """Stream a CSL-JSON file straight into Publication records."""
+    return [Publication.from_csl(record) for record in iter_csl_json(filepath, fields, stats)]
+
+
+def describe_skipped(stats: dict) -> str:
+    """Human-readable summary of how much a projected load left out."""
+    read = stats['bytes_read']
+    skipped = stats['bytes_skipped']
+    share = f" ({skipped / read:.0%})" if read else ''
+    return f"skipped {skipped / 1024:.1f} of {read / 1024:.1f} KB in unused fields{share}"
@@ -3,80 +3,587 @@
 Enrich Zotero CSL-JSON with citation counts from OpenAlex.
 
 This script reads a CSL-JSON file (typically exported from Zotero via Better BibTeX)
-and adds citation counts by querying the OpenAlex API. Results are cached to avoid
-repeated API calls.
+and looks up citation counts in the OpenAlex API. Results are cached to avoid
+repeated API calls. The output is a slim sidecar holding only the added fields,
+keyed by citation key; generate_papers_md.py joins it with the export at render time.
+With --stream the sidecar is written as NDJSON instead, one line per paper as
+soon as its lookup resolves, so generate_papers_md.py can render while the
+remaining lookups are still in flight.
+
+The cache is keyed by canonical DOI (csl_json.canonical_doi), so differently
+written copies of a DOI share one entry and one lookup. Caches written with
+the DOIs as they appeared in Zotero are migrated when loaded.
 
 Usage:
-  python enrich_from_openalex.py                              # papers_zotero.json → papers_enriched.json
+  python enrich_from_openalex.py                              # papers_zotero.json → papers_enrichment.json
   python enrich_from_openalex.py -i input.json -o output.json # Custom paths
-  python enrich_from_openalex.py --refresh                    # Ignore cache, fetch fresh data
+  python enrich_from_openalex.py --refresh                    # Refetch every cached entry
+  python enrich_from_openalex.py --max-age 30                 # Refetch entries older than 30 days
+  python enrich_from_openalex.py --author 0000-0002-1825-0097 # Prefetch an author's works first
+  python enrich_from_openalex.py --ingest-snapshot works/     # Build local index from a snapshot
+  python enrich_from_openalex.py --offline                    # Enrich from the local index only
+  python enrich_from_openalex.py --batch-size 1               # One request per DOI
+  python enrich_from_openalex.py --concurrency 4 --rate 10    # Start with 4 requests in flight, max 10/s
+  python enrich_from_openalex.py --max-concurrency 1          # One request at a time
+  python enrich_from_openalex.py --deadline 120               # Give OpenAlex at most 2 minutes
+  python enrich_from_openalex.py --stream | python generate_papers_md.py --enrichment -
+  python enrich_from_openalex.py --api-base http://127.0.0.1:8765  # Local stand-in server
+
+Only 404s are cached as "not found". If OpenAlex is unreachable or erroring,
+lookups that fail are not cached at all (stale entries keep their old values),
+and after a few failures in a row the rest of the run uses the cache alone.
 """
 
 import argparse
+import hashlib
 import json
+import os
+import re
+import sys
+import threading
 import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional
+from urllib.parse import quote
 
-import requests
+import openalex_index
+from csl_json import ENRICH_FIELDS, Publication, canonical_doi, describe_skipped, load_publications
+from openalex_client import CONNECT_TIMEOUT, READ_TIMEOUT, AdaptiveConcurrency, OpenAlexClient
 
 # Configuration
 MAILTO = "katherine.atkins@ed.ac.uk"
-OPENALEX_API = "https://api.openalex.org/works"
-REQUEST_DELAY = 0.5  # seconds between API requests
+API_BASE_ENV = "OPENALEX_API_BASE"  # e.g. http://127.0.0.1:8765 for _benchmarks/openalex_standin.py
+DEFAULT_API_BASE = "https://api.openalex.org"
+OPENALEX_API = f"{os.environ.get(API_BASE_ENV, DEFAULT_API_BASE).rstrip('/')}/works"
+REQUEST_RATE = 10.0  # max API requests per second (OpenAlex polite pool limit)
+CONCURRENCY = 1  # requests in flight at first
+MAX_CONCURRENCY = 8  # most requests in flight once latency and throttling allow
+BATCH_SIZE = 50  # DOIs per filter query
+MAX_BATCH_SIZE = 100  # OpenAlex accepts at most 100 OR'd values per filter
+AUTHOR_PAGE_SIZE = 200  # works per page when walking an author's list (API maximum)
+MAX_AGE_DAYS = None  # refetch found entries older than this (None = never)
+NEGATIVE_MAX_AGE_DAYS = 30  # refetch "not found" entries older than this
+TTL_JITTER = 0.25  # stretch each entry's TTL by up to this fraction so expiries spread out
 
 # Default file paths
 DEFAULT_INPUT = "papers_zotero.json"
-DEFAULT_OUTPUT = "papers_enriched.json"
+DEFAULT_OUTPUT = "papers_enrichment.json"
 CACHE_FILE = "openalex_cache.json"
+INDEX_FILE = "openalex_index.sqlite"
+
+# One pooled session for the whole run, created on first use (see get_client)
+_client = None
+
+
+class LookupFailed(Exception):
+    """A lookup got no answer (transport error, throttling or 5xx), as opposed to a 404."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket limiting callers to `rate` acquisitions per second."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CacheJournal:
+    """
+    Append-only log of cache entries fetched during a run.
+
+    Each lookup result is appended as one JSON line as soon as it arrives, so an
+    interrupted run loses nothing. load_cache replays the journal on the next run
+    and save_cache removes it once the full cache has been written.
+    """
+
+    def __init__(self, cache_path: str):
+        self.path = journal_path(cache_path)
+        self.file = None
+
+    def append(self, entries: dict):
+        """Durably record {doi: cache entry} pairs."""
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        for doi, entry in entries.items():
+            self.file.write(json.dumps([doi, entry]) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def journal_path(cache_path: str) -> Path:
+    """Journal file that sits next to the cache."""
+    return Path(f"{cache_path}.journal")
+
+
+def read_journal(cache_path: str) -> dict:
+    """Read entries left by an interrupted run, ignoring a torn final line."""
+    entries = {}
+    path = journal_path(cache_path)
+    if path.exists():
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    doi, entry = json.loads(line)
+                except ValueError:
+                    break
+                entries[doi] = entry
+    return entries
 
 
 def load_cache(cache_path: str) -> dict:
-    """Load cached OpenAlex data."""
+    """Load cached OpenAlex data, plus anything journalled by an interrupted run."""
+    cache = {}
     if Path(cache_path).exists():
         with open(cache_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {}
+            cache = json.load(f)
+
+    recovered = read_journal(cache_path)
+    if recovered:
+        print(f"  Recovered {len(recovered)} entries from an interrupted run")
+        cache.update(recovered)
+
+    migrated = migrate_cache(cache)
+    if migrated is not cache:
+        rekeyed = sum(1 for doi in cache if doi != canonical_doi(doi))
+        merged = len(cache) - len(migrated)
+        print(f"  Migrated {rekeyed} entries to canonical DOI keys ({merged} duplicates merged)")
+    return migrated
+
+
+def migrate_cache(cache: dict) -> dict:
+    """
+    Re-key a cache by canonical DOI.
+
+    Where several keys are the same DOI, the most recently fetched entry wins,
+    and a found entry beats a miss fetched at the same time. Returns `cache`
+    itself if every key is already canonical.
+    """
+    if all(doi == canonical_doi(doi) for doi in cache):
+        return cache
+
+    def rank(entry: Optional[dict]) -> tuple:
+        return ((entry or {}).get('fetched_at') or '', not is_miss(entry))
+
+    migrated = {}
+    for doi, entry in cache.items():
+        key = canonical_doi(doi)
+        if key not in migrated or rank(entry) > rank(migrated[key]):
+            migrated[key] = entry
+    return migrated
 
 
 def save_cache(cache: dict, cache_path: str):
-    """Save cache to disk."""
-    with open(cache_path, 'w', encoding='utf-8') as f:
+    """Atomically save cache to disk and discard the journal it supersedes."""
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(cache, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, cache_path)
+    journal_path(cache_path).unlink(missing_ok=True)
+
+
+def get_client() -> OpenAlexClient:
+    """
+    The shared OpenAlexClient, created on first use.
+
+    Creating it imports requests, which takes longer than a papers_pipeline.py
+    update that finds nothing changed, so runs that never look anything up skip it.
+    """
+    global _client
+    if _client is None:
+        _client = OpenAlexClient(MAILTO)
+    return _client
+
+
+def set_api_base(base: str):
+    """Send every OpenAlex request to `base` (e.g. a local stand-in) instead of the real API."""
+    global OPENALEX_API
+    OPENALEX_API = f"{base.rstrip('/')}/works"
 
 
 def query_openalex(doi: str) -> Optional[dict]:
-    """Query OpenAlex for a work by DOI."""
-    # Clean DOI - remove https://doi.org/ prefix if present
-    doi = doi.replace("https://doi.org/", "").replace("http://doi.org/", "")
+    """
+    Query OpenAlex for a work by DOI.
+
+    Returns:
+        The work, or None if OpenAlex doesn't have it (404)
 
-    url = f"{OPENALEX_API}/doi:{doi}?mailto={MAILTO}"
+    Raises:
+        LookupFailed: on any other outcome, which says nothing about the DOI
+    """
+    url = f"{OPENALEX_API}/doi:{quote(canonical_doi(doi), safe='/:;()')}?mailto={MAILTO}"
 
     try:
-        response = requests.get(url, timeout=30)
+        response = get_client().get(url)
         if response.status_code == 200:
             return response.json()
-        elif response.status_code == 404:
-            return None
-        else:
-            print(f"    Warning: OpenAlex returned {response.status_code} for {doi}")
+    except Exception as e:
+        raise LookupFailed(str(e)) from e
+    if response.status_code == 404:
+        return None
+    raise LookupFailed(f"OpenAlex returned {response.status_code}")
+
+
+def query_openalex_batch(dois: list[str]) -> Optional[dict]:
+    """
+    Query OpenAlex for several works at once using a multi-value DOI filter.
+
+    Returns:
+        {input DOI: work} for every DOI OpenAlex found, or None if the request failed
+    """
+    # OpenAlex reports DOIs as lowercase https://doi.org/ URLs
+    by_key = {}
+    for doi in dois:
+        by_key.setdefault(canonical_doi(doi), []).append(doi)
+
+    params = {
+        'filter': 'doi:' + '|'.join(by_key),
+        'per-page': len(by_key),
+        'select': 'id,doi,cited_by_count,open_access',
+        'mailto': MAILTO,
+    }
+
+    try:
+        response = get_client().get(OPENALEX_API, params=params)
+        if response.status_code != 200:
+            print(f"    Warning: OpenAlex returned {response.status_code} for batch of {len(dois)} DOIs")
             return None
+        results = response.json().get('results', [])
     except Exception as e:
-        print(f"    Error querying OpenAlex for {doi}: {e}")
+        print(f"    Error querying OpenAlex for batch of {len(dois)} DOIs: {e}")
         return None
 
+    found = {}
+    for work in results:
+        key = canonical_doi(work.get('doi') or '')
+        for doi in by_key.get(key, []):
+            found[doi] = work
+    return found
+
+
+def author_filter(author: str) -> str:
+    """
+    Build an OpenAlex works filter from an author ID or ORCID.
+
+    Accepts bare IDs (A5012345678, 0000-0002-1825-0097) or their URL forms.
+    """
+    key = author.strip().rstrip('/').rsplit('/', 1)[-1]
+    if re.fullmatch(r'\d{4}-\d{4}-\d{4}-\d{3}[\dX]', key, re.IGNORECASE):
+        return f"author.orcid:{key.upper()}"
+    if re.fullmatch(r'A\d+', key, re.IGNORECASE):
+        return f"author.id:{key.upper()}"
+    raise ValueError(f"Not an OpenAlex author ID or ORCID: {author}")
+
+
+def query_author_works(author: str, rate: float = REQUEST_RATE) -> list[dict]:
+    """
+    Walk an author's complete works list with cursor pagination.
+
+    Returns every work fetched; if a page fails, the works from earlier pages.
+    """
+    limiter = TokenBucket(rate)
+    params = {
+        'filter': author_filter(author),
+        'per-page': AUTHOR_PAGE_SIZE,
+        'select': 'id,doi,cited_by_count,open_access',
+        'mailto': MAILTO,
+        'cursor': '*',
+    }
 
-def enrich_publications(input_path: str, output_path: str, cache_path: str, refresh: bool = False):
-    """Enrich publications with OpenAlex citation counts."""
+    works = []
+    page = 0
+    while params['cursor']:
+        limiter.acquire()
+        try:
+            response = get_client().get(OPENALEX_API, params=params)
+            if response.status_code != 200:
+                print(f"    Warning: OpenAlex returned {response.status_code} for author works page")
+                break
+            data = response.json()
+        except Exception as e:
+            print(f"    Error querying OpenAlex for author works: {e}")
+            break
+        results = data.get('results', [])
+        works.extend(results)
+        page += 1
+        print(f"  Page {page}: {len(results)} works")
+        params['cursor'] = data.get('meta', {}).get('next_cursor') if results else None
+    return works
+
+
+def prefetch_author(author: str, dois: list[str], rate: float = REQUEST_RATE) -> tuple[dict, set]:
+    """
+    Build cache entries for every DOI in an author's OpenAlex works list.
+
+    Every DOI the author has is cached, not just those in the library.
+
+    Returns:
+        ({canonical doi: cache entry}, set of canonical library DOIs covered)
+    """
+    library = {canonical_doi(doi) for doi in dois}
+
+    entries = {}
+    for work in query_author_works(author, rate):
+        key = canonical_doi(work.get('doi') or '')
+        if key:
+            entries[key] = cache_entry(work)
+    return entries, library & entries.keys()
+
+
+def now_stamp() -> str:
+    """Current UTC time as stored in cache entries."""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def cache_entry(work: Optional[dict]) -> dict:
+    """Keep only the OpenAlex fields we use, stamped with the fetch time."""
+    if not work:
+        return {'not_found': True, 'fetched_at': now_stamp()}
+    return {
+        'cited_by_count': work.get('cited_by_count', 0),
+        'open_access': work.get('open_access', {}),
+        'openalex_id': work.get('id'),
+        'fetched_at': now_stamp()
+    }
 
-    # Load input
-    print(f"Reading {input_path}...")
-    with open(input_path, 'r', encoding='utf-8') as f:
-        publications = json.load(f)
-    print(f"  Found {len(publications)} publications")
 
-    # Load cache
-    cache = {} if refresh else load_cache(cache_path)
+def is_miss(entry: Optional[dict]) -> bool:
+    """True for "not found" entries, including legacy `null` ones."""
+    return entry is None or entry.get('not_found', False)
+
+
+def entry_age_days(entry: Optional[dict], now: datetime) -> Optional[float]:
+    """Days since an entry was fetched, or None for legacy entries without a stamp."""
+    stamp = (entry or {}).get('fetched_at')
+    if not stamp:
+        return None
+    fetched = datetime.fromisoformat(stamp.replace('Z', '+00:00'))
+    return (now - fetched).total_seconds() / 86400
+
+
+def ttl_days(doi: str, entry: Optional[dict], max_age: Optional[float],
+             negative_max_age: Optional[float]) -> Optional[float]:
+    """Days a cached entry stays fresh, or None if it never goes stale."""
+    limit = negative_max_age if is_miss(entry) else max_age
+    if limit is None:
+        return None
+    # Deterministic per-DOI jitter, so entries fetched in the same run expire over several runs
+    jitter = int(hashlib.md5(doi.encode('utf-8')).hexdigest()[:4], 16) / 0xffff * TTL_JITTER
+    return limit * (1 + jitter)
+
+
+def is_stale(doi: str, entry: Optional[dict], max_age: Optional[float], negative_max_age: Optional[float],
+             now: datetime) -> bool:
+    """Decide whether a cached entry should be refetched."""
+    ttl = ttl_days(doi, entry, max_age, negative_max_age)
+    if ttl is None:
+        return False
+    age = entry_age_days(entry, now)
+    if age is None:
+        return True
+    return age > ttl
+
+
+def next_expiry(cache: dict, dois: list[str], max_age: Optional[float] = MAX_AGE_DAYS,
+                negative_max_age: Optional[float] = NEGATIVE_MAX_AGE_DAYS) -> Optional[datetime]:
+    """
+    Earliest time any of `dois` needs refetching.
+
+    Returns:
+        That time (already past for uncached or unstamped entries), or None if
+        none of them ever goes stale
+    """
+    now = datetime.now(timezone.utc)
+    earliest = None
+    for doi in dois:
+        if doi not in cache:
+            return now
+        ttl = ttl_days(doi, cache[doi], max_age, negative_max_age)
+        if ttl is None:
+            continue
+        age = entry_age_days(cache[doi], now)
+        if age is None:
+            return now
+        expiry = now + timedelta(days=ttl - age)
+        if earliest is None or expiry < earliest:
+            earliest = expiry
+    return earliest
+
+
+def fetch_works(dois: list[str], batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY,
+                rate: float = REQUEST_RATE, journal: Optional[CacheJournal] = None,
+                max_concurrency: int = MAX_CONCURRENCY,
+                on_record: Optional[Callable[[dict], None]] = None) -> dict:
+    """
+    Look up DOIs in OpenAlex, batching them into filter queries where possible.
+
+    Lookups run in a thread pool, starting with `concurrency` in flight. The
+    client's AdaptiveConcurrency raises that towards `max_concurrency` while
+    responses stay fast and cuts it back on 429s, errors and slowdowns, and a
+    shared token bucket keeps the overall request rate at or below `rate` per
+    second whatever the concurrency. Each result is written to `journal` and
+    passed to `on_record` (as {canonical doi: cache entry}) as soon as it arrives.
+
+    DOIs are looked up by canonical form, once each.
+
+    Returns:
+        {canonical doi: cache entry}, in the order of `dois`, for every DOI
+        OpenAlex answered for; failed lookups are left out rather than cached as misses
+    """
+    dois = list(dict.fromkeys(canonical_doi(doi) for doi in dois))
+    results = {}
+    batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+    limiter = TokenBucket(rate)
+
+    if batch_size > 1:
+        # ',' and '|' are filter separators, so such DOIs can only be queried individually
+        batchable = [d for d in dois if ',' not in d and '|' not in d]
+        single = [d for d in dois if ',' in d or '|' in d]
+    else:
+        batchable, single = [], list(dois)
+
+    maximum = max(1, concurrency, max_concurrency)
+    get_client().concurrency = AdaptiveConcurrency(concurrency, maximum, log=lambda message: print(f"    {message}"))
+
+    def run_batch(batch: list[str]) -> Optional[dict]:
+        limiter.acquire()
+        return query_openalex_batch(batch)
+
+    def run_single(doi: str) -> Optional[dict]:
+        limiter.acquire()
+        return query_openalex(doi)
+
+    def record(entries: dict):
+        results.update(entries)
+        if journal:
+            journal.append(entries)
+        if on_record:
+            on_record(entries)
+
+    pool = ThreadPoolExecutor(max_workers=maximum)
+    try:
+        if batchable:
+            batches = [batchable[i:i + batch_size] for i in range(0, len(batchable), batch_size)]
+            futures = {pool.submit(run_batch, batch): batch for batch in batches}
+            for n, future in enumerate(as_completed(futures)):
+                batch = futures[future]
+                found = future.result()
+                if found is None:
+                    # Don't record a failed batch as misses; retry these one at a time
+                    print(f"  Batch {n+1}/{len(batches)} ({len(batch)} DOIs)... failed, falling back to single lookups")
+                    single.extend(batch)
+                    continue
+                record({doi: cache_entry(found.get(doi)) for doi in batch})
+                print(f"  Batch {n+1}/{len(batches)} ({len(batch)} DOIs)... {len(found)} found")
+
+        futures = {pool.submit(run_single, doi): doi for doi in single}
+        for n, future in enumerate(as_completed(futures)):
+            doi = futures[future]
+            try:
+                work = future.result()
+            except LookupFailed as e:
+                print(f"  Lookup {n+1}/{len(single)} {doi}... failed ({e})")
+                continue
+            record({doi: cache_entry(work)})
+            print(f"  Lookup {n+1}/{len(single)} {doi}... {'found' if work else 'not found'}")
+    finally:
+        # On Ctrl-C don't wait for queued lookups; finished ones are already journalled
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    # Completion order varies with concurrency; keep the cache stable
+    return {doi: results[doi] for doi in dois if doi in results}
+
+
+def lookup_index(dois: list[str], index_path: str, journal: Optional[CacheJournal] = None) -> dict:
+    """
+    Resolve DOIs from the local snapshot index instead of the API.
+
+    Returns:
+        {doi: cache entry}, in the order of `dois`
+    """
+    start = time.perf_counter()
+    conn = openalex_index.open_index(index_path)
+    try:
+        found = openalex_index.lookup_works(conn, dois)
+    finally:
+        conn.close()
+    results = {doi: cache_entry(found.get(doi)) for doi in dois}
+    if journal:
+        journal.append(results)
+    elapsed = time.perf_counter() - start
+    print(f"  {len(found)}/{len(dois)} found in {index_path} ({elapsed * 1000:.0f} ms)")
+    return results
+
+
+def enrichment_fields(pub: Publication, data: Optional[dict]) -> dict:
+    """Fields a cache entry adds to a publication: citation count and OA URL."""
+    if is_miss(data):
+        return {}
+    fields = {'citation-count': data.get('cited_by_count', 0)}
+    # Also add OA URL if available and not already present
+    oa_url = (data.get('open_access') or {}).get('oa_url')
+    if not pub.url and oa_url:
+        fields['URL'] = oa_url
+    return fields
+
+
+def enrich(publications: list[Publication], cache_path: str, refresh: bool = False,
+           batch_size: int = BATCH_SIZE, concurrency: int = CONCURRENCY,
+           max_concurrency: int = MAX_CONCURRENCY, rate: float = REQUEST_RATE, max_age: Optional[float] = MAX_AGE_DAYS,
+           negative_max_age: Optional[float] = NEGATIVE_MAX_AGE_DAYS,
+           author: Optional[str] = None, offline_index: Optional[str] = None,
+           deadline: Optional[float] = None, connect_timeout: float = CONNECT_TIMEOUT,
+           read_timeout: float = READ_TIMEOUT,
+           emit: Optional[Callable[[Publication, dict], None]] = None) -> dict:
+    """
+    Look up publications in OpenAlex (via the cache) and save the updated cache.
+
+    DOIs whose lookup fails keep their cached entry, if any, and DOIs with
+    none are left unenriched. After `deadline` seconds, or once the client's
+    circuit breaker trips, no more requests are sent.
+
+    If given, `emit(pub, fields)` is called once per publication as soon as
+    its fields are settled: straight away for cache hits and papers without a
+    DOI, and as each lookup resolves for the rest. Fields may be empty.
+
+    Returns:
+        Enrichment sidecar: {citation key: {'DOI': ..., 'citation-count': n, 'URL': ...}}
+    """
+    client = get_client()
+    client.connect_timeout = connect_timeout
+    client.read_timeout = read_timeout
+    client.start_run(deadline)
+
+    # With refresh every cached entry is stale, except those journalled by an
+    # interrupted run (fetched fresh), so an interrupted refresh resumes. Entries
+    # stay loaded, so a lookup that fails still falls back to the old value.
+    resumed = {canonical_doi(doi) for doi in read_journal(cache_path)} if refresh else set()
+    cache = load_cache(cache_path)
     if cache:
         print(f"  Loaded {len(cache)} cached entries")
 
@@ -85,14 +592,86 @@ def enrich_publications(input_path: str, output_path: str, cache_path: str, refr
         'cached': 0,
         'fetched': 0,
         'not_found': 0,
-        'no_doi': 0
+        'no_doi': 0,
+        'stale': 0,
+        'unavailable': 0,
     }
 
+    journal = CacheJournal(cache_path)
+    try:
+        # Resolve most of the library from the author's works list, a page at a time
+        prefetched = set()
+        if author:
+            library_dois = list(dict.fromkeys(canonical_doi(pub.doi) for pub in publications if pub.doi))
+            print(f"\nPrefetching works for author {author}...")
+            entries, prefetched = prefetch_author(author, library_dois, rate)
+            cache.update(entries)
+            journal.append(entries)
+            print(f"  Bulk pass covered {len(prefetched)}/{len(library_dois)} library DOIs "
+                  f"({len(entries)} works with DOIs)")
+
+        # Fetch every remaining cache miss and stale entry up front so they can be batched
+        now = datetime.now(timezone.utc)
+        to_fetch = []
+        seen = set()
+        for pub in publications:
+            if not pub.doi:
+                continue
+            doi = canonical_doi(pub.doi)
+            if doi in seen:
+                continue
+            seen.add(doi)
+            if doi not in cache:
+                to_fetch.append(doi)
+            elif (refresh and doi not in resumed) or is_stale(doi, cache[doi], max_age, negative_max_age, now):
+                to_fetch.append(doi)
+                stats['stale'] += 1
+
+        # Publications still waiting for a lookup, by canonical DOI
+        waiting = {}
+
+        def settle(entries: dict):
+            for doi, entry in entries.items():
+                for pub in waiting.pop(doi, ()):
+                    emit(pub, enrichment_fields(pub, entry))
+
+        if emit:
+            pending = set(to_fetch)
+            for pub in publications:
+                doi = canonical_doi(pub.doi) if pub.doi else None
+                if doi in pending:
+                    waiting.setdefault(doi, []).append(pub)
+                else:
+                    emit(pub, enrichment_fields(pub, cache.get(doi)) if doi else {})
+
+        if to_fetch and offline_index:
+            print(f"\nLooking up {len(to_fetch)} DOIs in local index ({stats['stale']} stale)...")
+            cache.update(lookup_index(to_fetch, offline_index, journal))
+        elif to_fetch:
+            print(f"\nFetching {len(to_fetch)} DOIs from OpenAlex ({stats['stale']} stale)...")
+            fetched = fetch_works(to_fetch, batch_size, concurrency, rate, journal, max_concurrency,
+                                  settle if emit else None)
+            cache.update(fetched)
+            failed = len(to_fetch) - len(fetched)
+            if failed:
+                reason = f" ({client.unavailable})" if client.unavailable else ''
+                print(f"  {failed} lookups failed{reason}; using cached values where there are any")
+                # Stale entries that couldn't be refreshed count as cached hits
+                stats['stale'] -= sum(1 for doi in to_fetch if doi not in fetched and doi in cache)
+                to_fetch = list(fetched)
+
+        # Index results, DOIs fetched by another thread and failed lookups (old value, if any)
+        settle({doi: cache.get(doi) for doi in list(waiting)})
+    finally:
+        journal.close()
+    fetched_now = set(to_fetch) | prefetched
+
     print(f"\nEnriching with OpenAlex data...")
 
+    enrichment = {}
     for i, pub in enumerate(publications):
-        doi = pub.get('DOI')
-        title_preview = (pub.get('title') or 'Unknown')[:50]
+        doi = canonical_doi(pub.doi) if pub.doi else None
+        title_preview = (pub.title or 'Unknown')[:50]
 
         print(f"  [{i+1}/{len(publications)}] {title_preview}...", end=' ', flush=True)
 
@@ -101,63 +680,246 @@ def enrich_publications(input_path: str, output_path: str, cache_path: str, refr
             stats['no_doi'] += 1
             continue
 
-        # Check cache first
-        if doi in cache:
-            data = cache[doi]
-            if data:
-                pub['citation-count'] = data.get('cited_by_count', 0)
-                # Also add OA URL if available and not already present
-                if not pub.get('URL') and data.get('open_access', {}).get('oa_url'):
-                    pub['URL'] = data['open_access']['oa_url']
-            print(f"cached ({pub.get('citation-count', 0)} citations)")
-            stats['cached'] += 1
+        if doi not in cache:
+            print("unavailable (lookup failed)")
+            stats['unavailable'] += 1
             continue
 
-        # Query OpenAlex
-        time.sleep(REQUEST_DELAY)
-        result = query_openalex(doi)
-
-        if result:
-            # Cache the useful data
-            cache[doi] = {
-                'cited_by_count': result.get('cited_by_count', 0),
-                'open_access': result.get('open_access', {}),
-                'openalex_id': result.get('id')
-            }
+        data = cache[doi]
+        fields = enrichment_fields(pub, data)
+        if fields:
+            enrichment[pub.key] = {'DOI': pub.doi, **fields}
 
-            pub['citation-count'] = result.get('cited_by_count', 0)
-
-            # Add OA URL if not present
-            if not pub.get('URL'):
-                oa_url = result.get('open_access', {}).get('oa_url')
-                if oa_url:
-                    pub['URL'] = oa_url
-
-            print(f"found ({pub['citation-count']} citations)")
+        if doi not in fetched_now:
+            print(f"cached ({fields.get('citation-count', 0)} citations)")
+            stats['cached'] += 1
+        elif fields:
+            print(f"found ({fields['citation-count']} citations)")
             stats['fetched'] += 1
         else:
-            cache[doi] = None  # Cache the miss
             print("not found in OpenAlex")
             stats['not_found'] += 1
+        fetched_now.discard(doi)
 
     # Save cache
     save_cache(cache, cache_path)
     print(f"\nSaved cache to {cache_path}")
 
-    # Save enriched output
-    print(f"Writing {output_path}...")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(publications, f, indent=2, ensure_ascii=False)
-
     # Summary
     print(f"\nSummary:")
     print(f"  Cached hits:    {stats['cached']}")
-    print(f"  Fresh fetches:  {stats['fetched']}")
+    print(f"  Fresh fetches:  {stats['fetched']} ({stats['stale']} refreshed stale entries)")
     print(f"  Not in OpenAlex:{stats['not_found']}")
     print(f"  No DOI:         {stats['no_doi']}")
+    if stats['unavailable']:
+        print(f"  Unavailable:    {stats['unavailable']} (lookup failed, nothing cached)")
+    print(f"  HTTP:           {client.summary()}")
+
+    return enrichment
+
+
+def stream_record(pub: Publication, fields: dict) -> str:
+    """One NDJSON line of the --stream sidecar: the citation key, DOI and any fields."""
+    record = {'key': pub.key, **({'DOI': pub.doi} if pub.doi else {}), **fields}
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def stream_end(count: int) -> str:
+    """Last line of a complete --stream sidecar; readers reject a stream without it."""
+    return json.dumps({'end': count}) + '\n'
+
+
+def write_enrichment(enrichment: dict, output_path: str):
+    """Write the enrichment sidecar."""
+    print(f"Writing {output_path}...")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(enrichment, f, indent=2, ensure_ascii=False)
+
+
+def enrich_publications(input_path: str, output_path: str, cache_path: str, refresh: bool = False,
+                        stream: bool = False, **options):
+    """
+    Enrich a CSL-JSON file with OpenAlex citation counts, writing the sidecar.
+
+    With `stream`, the sidecar is written as NDJSON (stream_record lines, every
+    paper) as lookups resolve, each line flushed; output_path '-' is stdout,
+    in which case progress goes to stderr. A stream_end line follows once
+    enrichment has finished, so a reader can tell a complete stream from one
+    cut short by a crash.
+    """
+    if stream:
+        to_stdout = output_path == '-'
+        out = sys.stdout if to_stdout else open(output_path, 'w', encoding='utf-8')
+
+        written = 0
+
+        def emit(pub: Publication, fields: dict):
+            nonlocal written
+            out.write(stream_record(pub, fields))
+            out.flush()
+            written += 1
+
+        try:
+            with redirect_stdout(sys.stderr if to_stdout else sys.stdout):
+                publications = read_publications(input_path)
+                enrich(publications, cache_path, refresh, emit=emit, **options)
+                out.write(stream_end(written))
+                out.flush()
+                print(f"\nDone! Streamed enrichment to {'stdout' if to_stdout else output_path}")
+        finally:
+            if not to_stdout:
+                out.close()
+        return
+
+    publications = read_publications(input_path)
+    enrichment = enrich(publications, cache_path, refresh, **options)
+
+    print()
+    write_enrichment(enrichment, output_path)
     print(f"\nDone! Enriched data saved to {output_path}")
 
 
+def read_publications(input_path: str) -> list[Publication]:
+    """Load the fields enrichment needs from a CSL-JSON file."""
+    print(f"Reading {input_path}...")
+    load_stats = {}
+    publications = load_publications(input_path, ENRICH_FIELDS, load_stats)
+    print(f"  Found {len(publications)} publications, {describe_skipped(load_stats)}")
+    return publications
+
+
+def add_enrich_arguments(parser: argparse.ArgumentParser):
+    """Add the cache and lookup options shared with papers_pipeline.py."""
+    parser.add_argument(
+        '--cache',
+        default=CACHE_FILE,
+        help=f'Cache file path (default: {CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Refetch every cached entry from OpenAlex (failed lookups keep their cached values)'
+    )
+    parser.add_argument(
+        '--max-age',
+        type=float,
+        default=MAX_AGE_DAYS,
+        metavar='DAYS',
+        help='Refetch cached entries older than this many days (default: never)'
+    )
+    parser.add_argument(
+        '--negative-max-age',
+        type=float,
+        default=NEGATIVE_MAX_AGE_DAYS,
+        metavar='DAYS',
+        help=f'Refetch "not found" entries older than this many days (default: {NEGATIVE_MAX_AGE_DAYS})'
+    )
+    parser.add_argument(
+        '--author',
+        help='OpenAlex author ID or ORCID whose works are prefetched in bulk before per-DOI lookups'
+    )
+    parser.add_argument(
+        '--index',
+        default=INDEX_FILE,
+        help=f'Local OpenAlex snapshot index (default: {INDEX_FILE})'
+    )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Resolve DOIs from the local index instead of the OpenAlex API'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=BATCH_SIZE,
+        help=f'DOIs per OpenAlex filter query, 1 = one request per DOI (default: {BATCH_SIZE}, max: {MAX_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=CONCURRENCY,
+        help=f'OpenAlex requests in flight at first (default: {CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--max-concurrency',
+        type=int,
+        default=MAX_CONCURRENCY,
+        metavar='N',
+        help=f'Most OpenAlex requests in flight as concurrency adapts to latency and throttling (default: {MAX_CONCURRENCY})'
+    )
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=REQUEST_RATE,
+        help=f'Maximum OpenAlex requests per second (default: {REQUEST_RATE:g})'
+    )
+    parser.add_argument(
+        '--deadline',
+        type=float,
+        metavar='SECONDS',
+        help='Stop sending OpenAlex requests after this long and use the cache for the rest (default: no limit)'
+    )
+    parser.add_argument(
+        '--connect-timeout',
+        type=float,
+        default=CONNECT_TIMEOUT,
+        metavar='SECONDS',
+        help=f'Seconds to wait for a connection to OpenAlex (default: {CONNECT_TIMEOUT:g})'
+    )
+    parser.add_argument(
+        '--read-timeout',
+        type=float,
+        default=READ_TIMEOUT,
+        metavar='SECONDS',
+        help=f'Seconds to wait for an OpenAlex response once connected (default: {READ_TIMEOUT:g})'
+    )
+    parser.add_argument(
+        '--api-base',
+        metavar='URL',
+        help=f'OpenAlex API base URL, e.g. a local stand-in (default: ${API_BASE_ENV} or {DEFAULT_API_BASE})'
+    )
+
+
+def check_enrich_arguments(args: argparse.Namespace) -> Optional[str]:
+    """Validate options added by add_enrich_arguments; return an error message or None."""
+    if args.rate <= 0:
+        return "--rate must be greater than 0"
+
+    if args.offline and not Path(args.index).exists():
+        return f"Index not found: {args.index} (build it with --ingest-snapshot)"
+
+    if args.offline and args.author:
+        return "--author needs the OpenAlex API and can't be combined with --offline"
+
+    if args.author:
+        try:
+            author_filter(args.author)
+        except ValueError as e:
+            return str(e)
+
+    if args.api_base and not re.match(r'https?://', args.api_base):
+        return f"--api-base must be an http:// or https:// URL: {args.api_base}"
+    return None
+
+
+def enrich_options(args: argparse.Namespace) -> dict:
+    """Keyword arguments for enrich() from options added by add_enrich_arguments."""
+    return {
+        'refresh': args.refresh,
+        'batch_size': args.batch_size,
+        'concurrency': args.concurrency,
+        'max_concurrency': args.max_concurrency,
+        'rate': args.rate,
+        'max_age': args.max_age,
+        'negative_max_age': args.negative_max_age,
+        'author': args.author,
+        'offline_index': args.index if args.offline else None,
+        'deadline': args.deadline,
+        'connect_timeout': args.connect_timeout,
+        'read_timeout': args.read_timeout,
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Enrich Zotero CSL-JSON with OpenAlex citation counts.',
@@ -165,8 +927,17 @@ def main():
         epilog="""
 Examples:
   python enrich_from_openalex.py
-  python enrich_from_openalex.py -i my_pubs.json -o enriched.json
-  python enrich_from_openalex.py --refresh  # Ignore cache
+  python enrich_from_openalex.py -i my_pubs.json -o enrichment.json
+  python enrich_from_openalex.py --refresh  # Refetch every cached entry
+  python enrich_from_openalex.py --batch-size 1  # One request per DOI
+  python enrich_from_openalex.py --concurrency 4  # Start with 4 requests in flight
+  python enrich_from_openalex.py --max-age 30     # Refresh entries older than 30 days
+  python enrich_from_openalex.py --author A5012345678  # Bulk prefetch by author
+  python enrich_from_openalex.py --ingest-snapshot openalex-snapshot/data/works
+  python enrich_from_openalex.py --offline        # No network; use the local index
+  python enrich_from_openalex.py --deadline 120   # Use the cache after 2 minutes
+  python enrich_from_openalex.py --stream | python generate_papers_md.py --enrichment -
+  python enrich_from_openalex.py --api-base http://127.0.0.1:8765  # Local stand-in
         """
     )
 
@@ -177,28 +948,45 @@ Examples:
     )
     parser.add_argument(
         '-o', '--output',
-        default=DEFAULT_OUTPUT,
-        help=f'Output enriched JSON file (default: {DEFAULT_OUTPUT})'
+        help=f'Output enrichment sidecar JSON file (default: {DEFAULT_OUTPUT}, or stdout with --stream)'
     )
     parser.add_argument(
-        '--cache',
-        default=CACHE_FILE,
-        help=f'Cache file path (default: {CACHE_FILE})'
+        '--stream',
+        action='store_true',
+        help='Write the sidecar as NDJSON, one line per paper as soon as its lookup resolves '
+             '(for generate_papers_md.py --enrichment -); "-o -" is stdout'
     )
     parser.add_argument(
-        '--refresh',
-        action='store_true',
-        help='Ignore cache and fetch fresh data from OpenAlex'
+        '--ingest-snapshot',
+        nargs='+',
+        metavar='PATH',
+        help='Ingest OpenAlex snapshot works partitions (.gz files or directories) into the index and exit'
     )
+    add_enrich_arguments(parser)
 
     args = parser.parse_args()
 
+    if args.ingest_snapshot:
+        print(f"Ingesting OpenAlex snapshot into {args.index}...")
+        stats = openalex_index.ingest_snapshot(args.ingest_snapshot, args.index)
+        print(f"\nIngested {stats['works']} works from {stats['partitions']} partitions "
+              f"({stats['skipped']} already up to date)")
+        return 0
+
     # Check input exists
     if not Path(args.input).exists():
         print(f"Error: Input file not found: {args.input}")
         return 1
 
-    enrich_publications(args.input, args.output, args.cache, args.refresh)
+    error = check_enrich_arguments(args)
+    if error:
+        print(f"Error: {error}")
+        return 1
+
+    if args.api_base:
+        set_api_base(args.api_base)
+    output = args.output or ('-' if args.stream else DEFAULT_OUTPUT)
+    enrich_publications(args.input, output, args.cache, stream=args.stream, **enrich_options(args))
     return 0
 
 
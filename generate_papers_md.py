@@ -2,105 +2,144 @@
 """
 Generate papers.md from CSL-JSON publications data.
 
-This standalone script reads a CSL-JSON file (e.g., publications.json)
-and generates a formatted markdown file for a publications page.
+This script reads a CSL-JSON file (e.g., papers_zotero.json), joins
+in citation counts from the enrichment sidecar written by enrich_from_openalex.py
+if present, and generates a formatted markdown file for a publications page.
 
 Usage:
-  python generate_papers_md.py                    # Uses publications.json → papers.md
+  python generate_papers_md.py                    # Uses papers_zotero.json → papers.md
   python generate_papers_md.py -i custom.json     # Custom input
   python generate_papers_md.py -o output.md       # Custom output
+  python generate_papers_md.py --no-enrichment    # Ignore the enrichment sidecar
+  python generate_papers_md.py --render-cache     # Reuse unchanged entries from the last run
+  python generate_papers_md.py --shard            # papers/YYYY.md per year, papers.md as index
+  python generate_papers_md.py --format html      # Entries in _includes/papers.html
+  python generate_papers_md.py --search-index     # Also assets/papers-search.json for the search box
+  python generate_papers_md.py --lazy-years 5     # Older years in assets/papers/, loaded when opened
+  python generate_papers_md.py --export bibtex    # Also assets/papers.bib (and/or ris, jsonld)
+  python enrich_from_openalex.py --stream | python generate_papers_md.py --enrichment -
+                                                  # Render entries as their citation counts arrive
   python generate_papers_md.py --help             # Show help
 """
 
 import argparse
+import hashlib
 import json
 import re
 import sys
+from contextlib import ExitStack
+from html import escape
+from itertools import chain
 from pathlib import Path
-from typing import Optional
+from typing import Iterable, Iterator, Optional
+
+from csl_json import RENDER_FIELDS, Author, Publication, describe_skipped, load_publications
+from papers_search import build_search_index, search_tokens
 
 # Default configuration
 DEFAULT_CONFIG = {
+    'title': 'Papers',                 # Page title (None = untitled, left out of the site navigation)
+    'permalink': '/papers/',           # URL of the page
     'highlight_author': 'Atkins',      # Author surname to bold
     'show_citations': True,            # Show citation counts
     'show_oa_links': True,             # Show Open Access links
     'max_authors': None,               # None = show all, or int for "et al."
+    'format': 'markdown',              # 'html' = entries pre-rendered into an _includes/ file
+    'include': 'papers.html',          # Include file name for the html format
+    'search_index': None,              # None = no search box, or path of the JSON search index
+    'shard_dir': None,                 # None = single page, or directory for one page per year
+    'shard_size': None,                # With shard_dir: entries per page instead of per year
+    'lazy_years': None,                # None = inline every year, or int: older years loaded on demand
+    'entry_anchors': False,            # Give every entry an #entry-N id (implied by lazy_years)
+    'exports': (),                     # Extra formats written alongside the page (see EXPORT_WRITERS)
     'header_note': '***In addition to the listed papers, I am also part of the Centre for Mathematical Modelling of Infectious Diseases COVID-19 Working Group, whose publications are listed [here](https://cmmid.github.io/topics/covid19/).***',
 }
 
 # Default file paths
 DEFAULT_INPUT = 'papers_zotero.json'
 DEFAULT_OUTPUT = 'papers.md'
+DEFAULT_ENRICHMENT = 'papers_enrichment.json'
+DEFAULT_SHARD_DIR = 'papers'
+DEFAULT_SEARCH_INDEX = 'assets/papers-search.json'
+INCLUDES_DIR = '_includes'
+SHARD_MARKER_HTML = '<!-- papers_shard: true -->'  # first line of generated includes and fragments
+LAZY_DIR = 'assets/papers'  # per-year fragments written by --lazy-years
+RENDER_CACHE_FILE = '.papers_render_cache.json'  # used by --render-cache
 
+# Config keys that change how an individual entry renders
+ENTRY_CONFIG_KEYS = ('entry_anchors', 'format', 'highlight_author', 'max_authors', 'show_citations',
+                     'show_oa_links')
 
 
-def load_csl_json(filepath: str) -> list[dict]:
-    """Load and parse a CSL-JSON file."""
+def load_enrichment(filepath: str) -> dict:
+    """Load the enrichment sidecar: {citation key: {'citation-count': n, 'URL': ...}}."""
     with open(filepath, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    if not isinstance(data, list):
-        raise ValueError("CSL-JSON file should contain an array of publications")
+        return json.load(f)
 
-    return data
 
-
-def extract_entry_number(pub: dict) -> Optional[int]:
-    """Extract entry number from the note field."""
-    note = pub.get('note', '')
-    match = re.search(r'Original entry:\s*\[(\d+)\]', note)
-    if match:
-        return int(match.group(1))
-    return None
+def is_enrichment_stream(filepath: str) -> bool:
+    """True for an NDJSON sidecar from enrich_from_openalex.py --stream ('-' is stdin)."""
+    return filepath == '-' or filepath.endswith('.ndjson')
 
 
-def get_year(pub: dict) -> Optional[int]:
-    """Extract publication year from CSL-JSON issued field."""
-    issued = pub.get('issued', {})
-    date_parts = issued.get('date-parts', [[]])
-    if date_parts and date_parts[0]:
-        return date_parts[0][0]
-    return None
-
+def iter_enrichment_stream(lines: Iterable[str]) -> Iterator[tuple[str, dict]]:
+    """
+    Yield (citation key, fields) from NDJSON sidecar lines as they are read.
 
-def format_author_name(author: dict) -> str:
-    """Format a single author from CSL-JSON format."""
-    # Handle literal names (e.g., consortiums, working groups)
-    if 'literal' in author:
-        return author['literal']
+    Raises ValueError if the stream ends without its {"end": n} line (or
+    doesn't hold n records), i.e. enrichment crashed or the stream was cut short.
+    """
+    count = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if 'end' in record:
+            if record['end'] != count:
+                raise ValueError(f"enrichment stream has {count} records but says it has {record['end']}")
+            return
+        count += 1
+        yield record.pop('key'), record
+    raise ValueError(f"enrichment stream ended after {count} records without its end marker "
+                     f"(enrich_from_openalex.py --stream failed or was interrupted)")
+
+
+def join_fields(pub: Publication, extra: Optional[dict]) -> Publication:
+    """Add a sidecar entry's citation count and OA URL to a publication."""
+    if not extra:
+        return pub
+    return pub._replace(
+        citation_count=extra.get('citation-count', pub.citation_count),
+        url=extra.get('URL', pub.url),
+    )
 
-    given = author.get('given', '')
-    family = author.get('family', '')
 
-    if given and family:
-        return f"{given} {family}"
-    elif family:
-        return family
-    elif given:
-        return given
-    return "Unknown"
+def join_enrichment(publications: list[Publication], enrichment: dict) -> list[Publication]:
+    """Add sidecar citation counts and OA URLs to the publications they belong to."""
+    return [join_fields(pub, enrichment.get(pub.key)) for pub in publications]
 
 
-def format_authors(authors: list[dict], highlight: str = 'Atkins', max_authors: int = None) -> str:
+def format_authors(authors: tuple[Author, ...], highlight: str = 'Atkins', max_authors: int = None,
+                   html: bool = False) -> str:
     """
     Format author list with optional highlighting and truncation.
 
     Args:
-        authors: List of CSL-JSON author objects
+        authors: Pre-parsed authors of a Publication
         highlight: Surname to bold
         max_authors: Maximum authors before "et al." (None = show all)
+        html: Escape names and bold with <strong> rather than markdown
     """
     if not authors:
         return "Unknown authors"
 
     formatted = []
     for author in authors:
-        name = format_author_name(author)
-        family = author.get('family', '')
+        name = escape(author.name) if html else author.name
 
         # Bold if matches highlight (exact match to avoid e.g. "Atkinson" matching "Atkins")
-        if highlight and highlight.lower() == family.lower():
-            name = f"**{name}**"
+        if highlight and highlight.lower() == author.family.lower():
+            name = f"<strong>{name}</strong>" if html else f"**{name}**"
 
         formatted.append(name)
 
@@ -111,17 +150,18 @@ def format_authors(authors: list[dict], highlight: str = 'Atkins', max_authors:
     return ', '.join(formatted)
 
 
-def format_citation_details(pub: dict) -> str:
-    """Format journal, volume, issue, pages."""
+def format_citation_details(pub: Publication, html: bool = False) -> str:
+    """Format journal, volume, issue, pages (as HTML if `html`)."""
     parts = []
+    text = escape if html else str
 
-    journal = pub.get('container-title')
+    journal = pub.container_title
     if journal:
-        parts.append(f"*{journal}*")
+        parts.append(f"<em>{escape(journal)}</em>" if html else f"*{journal}*")
 
-    volume = pub.get('volume')
-    issue = pub.get('issue')
-    page = pub.get('page')
+    volume = pub.volume and text(pub.volume)
+    issue = pub.issue and text(pub.issue)
+    page = pub.page and text(pub.page)
 
     vol_str = ''
     if volume:
@@ -137,22 +177,22 @@ def format_citation_details(pub: dict) -> str:
     return ' '.join(parts)
 
 
-def format_entry(pub: dict, entry_num: int, config: dict) -> str:
+def format_entry(pub: Publication, config: dict) -> str:
     """Format a single publication entry as markdown."""
     lines = []
 
     # Authors and year
     authors_str = format_authors(
-        pub.get('author', []),
+        pub.authors,
         highlight=config.get('highlight_author'),
         max_authors=config.get('max_authors')
     )
-    year = get_year(pub) or 'Unknown'
+    year = pub.year or 'Unknown'
 
-    lines.append(f"[{entry_num}] {authors_str} ({year})")
+    lines.append(f"[{pub.entry_num}] {authors_str} ({year})")
 
     # Title and citation details
-    title = pub.get('title', 'Unknown title')
+    title = pub.title if pub.title is not None else 'Unknown title'
     # Clean up any HTML tags in title
     title = re.sub(r'<[^>]+>', '', title)
 
@@ -163,7 +203,7 @@ def format_entry(pub: dict, entry_num: int, config: dict) -> str:
         lines.append(f"**{title}**")
 
     # DOI link
-    doi = pub.get('DOI')
+    doi = pub.doi
     if doi:
         lines.append(f"DOI: [{doi}](https://doi.org/{doi})")
 
@@ -171,46 +211,262 @@ def format_entry(pub: dict, entry_num: int, config: dict) -> str:
     extras = []
 
     if config.get('show_citations'):
-        citations = pub.get('citation-count')
+        citations = pub.citation_count
         if citations is not None:
             extras.append(f"Citations: {citations}")
 
     if config.get('show_oa_links'):
-        url = pub.get('URL')
+        url = pub.url
         if url and 'doi.org' not in url:  # Don't duplicate DOI link
             extras.append(f"[Open Access]({url})")
 
     if extras:
         lines.append(' | '.join(extras))
 
+    # kramdown block attribute: gives the paragraph a stable #entry-N anchor
+    if config.get('entry_anchors'):
+        lines.append(f"{{: #entry-{pub.entry_num}}}")
+
     return '\n'.join(lines)
 
 
-def group_publications(publications: list[dict]) -> dict:
+AUTHORS_FIELD = Publication._fields.index('authors')
+
+
+class RenderCache:
     """
-    Group publications by year.
+    Rendered entries from the previous run, keyed by citation key.
 
-    Returns:
-        {year: [pubs]}
+    Each entry is stored with a hash of the publication record, the entry
+    config and the code that renders it (this script, and papers_search.py for
+    the search tokens), so a changed record, option or formatting rule is
+    simply a miss. Entries for records that weren't rendered this run are
+    dropped on save.
+
+    Checking a markdown entry costs about as much as formatting it (~10 us), so
+    this only pays off for costlier formats and is off by default.
     """
-    by_year = {}
 
-    # First pass: extract entry numbers and find max for auto-numbering
-    max_entry = 0
-    for pub in publications:
-        entry_num = extract_entry_number(pub)
-        pub['_entry_num'] = entry_num
-        if entry_num and entry_num > max_entry:
-            max_entry = entry_num
+    def __init__(self, path: Optional[str], config: dict):
+        self.path = path
+        self.config = config
+        self.entries = {}
+        if path and Path(path).exists():
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                # Only a cache; start again
+                self.entries = {}
+        self.loaded_tokens = sum(1 for entry in self.entries.values() if len(entry) > 2)
+        self.rendered = {}
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+        salt = {k: config.get(k) for k in ENTRY_CONFIG_KEYS}
+        salt['code'] = {path.name: hashlib.sha256(path.read_bytes()).hexdigest()
+                        for path in (Path(__file__), Path(__file__).with_name('papers_search.py'))}
+        # Hashed once; each digest continues from a copy
+        self.salted = hashlib.sha1(json.dumps(salt, sort_keys=True).encode('utf-8'))
+
+    def digest(self, pub: Publication):
+        """Identify a record's rendered form: equal digests render identically."""
+        digest = self.salted.copy()
+        # Authors are tuples of strings, so flattening and joining them
+        # is much cheaper than repr; the other fields are short
+        digest.update(('\x1e'.join(chain.from_iterable(pub.authors)) + '\x1d'
+                       + repr(pub[:AUTHORS_FIELD] + pub[AUTHORS_FIELD + 1:])).encode('utf-8'))
+        return digest.hexdigest()
+
+    def render(self, pub: Publication) -> str:
+        """Return the cached entry for `pub` if its record is unchanged, else format it."""
+        digest = self.digest(pub)
+        cached = self.entries.get(pub.key)
+        if cached and cached[0] == digest:
+            self.hits += 1
+            # Keeps the search tokens too, if they were cached
+            self.rendered[pub.key] = cached
+            return cached[1]
+        self.misses += 1
+        text = render_entry(pub, self.config)
+        self.rendered[pub.key] = [digest, text]
+        return text
+
+    def tokens(self, pub: Publication) -> list[str]:
+        """Search tokens of a publication rendered this run, cached with its entry."""
+        entry = self.rendered.get(pub.key)
+        if entry is None:
+            return search_tokens(pub)
+        if len(entry) < 3:
+            entry.append(search_tokens(pub))
+        return entry[2]
+
+    def save(self):
+        """Write this run's entries, evicting records no longer in the library."""
+        self.evicted = len(self.entries.keys() - self.rendered.keys())
+        if not self.path:
+            return
+        # Every entry a hit, none evicted and no search tokens added: the file is current
+        # (tokens may be added through another cache sharing the entries, so count them)
+        if not self.misses and not self.evicted and self.with_tokens() == self.loaded_tokens:
+            return
+        # dumps runs the C encoder, unlike dump to a file
+        text = json.dumps(self.rendered, ensure_ascii=False)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def with_tokens(self) -> int:
+        """Number of rendered entries holding their search tokens."""
+        return sum(1 for entry in self.rendered.values() if len(entry) > 2)
+
+    def summary(self) -> str:
+        """One-line hit rate report."""
+        total = self.hits + self.misses
+        rate = f" ({self.hits / total:.0%})" if total else ''
+        return (f"{self.hits}/{total} entries from cache{rate}, {self.misses} rendered, "
+                f"{self.evicted} evicted")
+
+
+class WarmRenderCache(RenderCache):
+    """
+    Render cache held in memory between passes (papers_pipeline.py --watch).
+
+    Config and script can't change within a process, so entries are checked by
+    comparing Publication records directly, which is cheaper than formatting.
+    Seed each pass with the previous pass's `rendered` entries.
+    """
+
+    def __init__(self, config: dict, entries: Optional[dict] = None):
+        super().__init__(None, config)
+        self.entries = entries or {}
+
+    def digest(self, pub: Publication):
+        return pub
+
+
+class StreamingRender:
+    """
+    Renders entries as their enrichment arrives (enrich_from_openalex.py --stream).
+
+    The publications are numbered up front, so each entry can be formatted as
+    soon as its record is joined; when the stream ends only the page assembly
+    is left. Publications the stream never mentions render unenriched.
+    """
+
+    def __init__(self, publications: list[Publication], config: dict,
+                 render_cache: Optional[RenderCache] = None):
+        self.config = config
+        self.render_cache = render_cache
+        self.publications = number_publications(publications)
+        self.positions = {pub.key: i for i, pub in enumerate(self.publications)}
+        self.entries = {}
+
+    def add(self, key: str, fields: dict):
+        """Join one enrichment record and render its entry."""
+        i = self.positions.get(key)
+        if i is None:
+            return
+        pub = join_fields(self.publications[i], fields)
+        self.publications[i] = pub
+        if not pub.year:
+            return
+        if self.render_cache:
+            # Share the render cache's entry, so search tokens added to it later are saved too
+            self.render_cache.render(pub)
+            self.entries[pub.key] = self.render_cache.rendered[pub.key]
+        else:
+            self.entries[pub.key] = [pub, render_entry(pub, self.config)]
+
+    def finish(self) -> tuple[list[Publication], RenderCache]:
+        """The joined publications, and a render cache that hands back the rendered entries."""
+        if self.render_cache:
+            # Entries are keyed by the render cache's digests
+            cache = RenderCache(None, self.config)
+            cache.entries = self.entries
+            return self.publications, cache
+        return self.publications, WarmRenderCache(self.config, self.entries)
+
+
+def format_entry_html(pub: Publication, config: dict) -> str:
+    """Format a single publication entry as HTML, with the same content as format_entry."""
+    lines = []
+
+    authors_str = format_authors(
+        pub.authors,
+        highlight=config.get('highlight_author'),
+        max_authors=config.get('max_authors'),
+        html=True
+    )
+    year = escape(str(pub.year or 'Unknown'))
+
+    lines.append(f"[{pub.entry_num}] {authors_str} ({year})")
+
+    title = pub.title if pub.title is not None else 'Unknown title'
+    title = escape(re.sub(r'<[^>]+>', '', title))
+
+    citation = format_citation_details(pub, html=True)
+    if citation:
+        lines.append(f"<strong>{title}</strong> {citation}")
+    else:
+        lines.append(f"<strong>{title}</strong>")
+
+    doi = pub.doi
+    if doi:
+        lines.append(f'DOI: <a href="https://doi.org/{escape(doi)}">{escape(doi)}</a>')
+
+    extras = []
+
+    if config.get('show_citations'):
+        citations = pub.citation_count
+        if citations is not None:
+            extras.append(f"Citations: {escape(str(citations))}")
+
+    if config.get('show_oa_links'):
+        url = pub.url
+        if url and 'doi.org' not in url:
+            extras.append(f'<a href="{escape(url)}">Open Access</a>')
+
+    if extras:
+        lines.append(' | '.join(extras))
+
+    # Lines within a paragraph, as kramdown renders the markdown version
+    opening = f'<p id="entry-{pub.entry_num}">' if config.get('entry_anchors') else '<p>'
+    return opening + '\n'.join(lines) + '</p>'
+
+
+def render_entry(pub: Publication, config: dict) -> str:
+    """Format one entry in the configured output format."""
+    if config.get('format') == 'html':
+        return format_entry_html(pub, config)
+    return format_entry(pub, config)
+
+
+def number_publications(publications: list[Publication]) -> list[Publication]:
+    """Number publications that have no entry number, after the highest existing one."""
+    max_entry = max((pub.entry_num for pub in publications if pub.entry_num), default=0)
 
-    # Second pass: assign entry numbers to papers without them and group
+    numbered = []
     next_entry = max_entry + 1
     for pub in publications:
-        if pub['_entry_num'] is None:
-            pub['_entry_num'] = next_entry
+        if pub.entry_num is None:
+            pub = pub._replace(entry_num=next_entry)
             next_entry += 1
+        numbered.append(pub)
+    return numbered
 
-        year = get_year(pub)
+
+def group_publications(publications: list[Publication]) -> dict:
+    """
+    Group publications by year, numbering any that have no entry number.
+
+    Returns:
+        {year: [pubs]}
+    """
+    by_year = {}
+
+    for pub in number_publications(publications):
+        year = pub.year
 
         if year:
             if year not in by_year:
@@ -220,13 +476,24 @@ def group_publications(publications: list[dict]) -> dict:
     return by_year
 
 
-def generate_markdown(publications: list[dict], config: dict) -> str:
-    """Generate the full markdown document."""
+def search_front_matter(config: dict) -> list[str]:
+    """Front matter line that makes the page layout load the search script."""
+    if not config.get('search_index'):
+        return []
+    return [f"search_index: /{Path(config['search_index']).as_posix()}"]
+
+
+def page_header(config: dict) -> list[str]:
+    """Front matter, header note and download links of the papers page, as markdown lines."""
+    exports = config.get('exports') or ()
     output = [
         "---",
         "layout: page",
-        "title: Papers",
-        "permalink: /papers/",
+        *([f"title: {config['title']}"] if config.get('title') else []),
+        f"permalink: {config['permalink']}",
+        *search_front_matter(config),
+        *(["lazy_years: true"] if config.get('lazy_years') else []),
+        *([f"jsonld: {Path(EXPORT_WRITERS['jsonld'].path).name}"] if 'jsonld' in exports else []),
         "---",
         "",
     ]
@@ -237,24 +504,653 @@ def generate_markdown(publications: list[dict], config: dict) -> str:
         output.append(header_note)
         output.append("")
 
+    downloads = [
+        f"[{EXPORT_WRITERS[name].label}]({{{{ '/{EXPORT_WRITERS[name].path}' | relative_url }}}})"
+        for name in exports if EXPORT_WRITERS[name].download
+    ]
+    if downloads:
+        output.append(f"Download: {' | '.join(downloads)}")
+        output.append("")
+    return output
+
+
+def generate_markdown(publications: list[Publication], config: dict,
+                      render_cache: Optional[RenderCache] = None) -> str:
+    """Generate the full markdown document, reusing unchanged entries from `render_cache`."""
+    output = page_header(config)
+
     # Group publications by year
     by_year = group_publications(publications)
 
-    # Year sections (newest first)
+    output.extend(render_years(by_year, config, render_cache))
+
+    return '\n'.join(output)
+
+
+def render_years(by_year: dict, config: dict, render_cache: Optional[RenderCache] = None) -> list[str]:
+    """Render year sections (newest first) as markdown lines."""
+    output = []
     for year in sorted(by_year.keys(), reverse=True):
         output.append(f"### {year}")
         output.append("")
 
         # Sort by entry number within year (descending)
         pubs = by_year[year]
-        pubs.sort(key=lambda x: x.get('_entry_num', 0), reverse=True)
+        pubs.sort(key=lambda x: x.entry_num or 0, reverse=True)
 
         for pub in pubs:
-            entry_num = pub.get('_entry_num', 0)
-            output.append(format_entry(pub, entry_num, config))
+            output.append(render_cache.render(pub) if render_cache else format_entry(pub, config))
             output.append("")
+    return output
 
-    return '\n'.join(output)
+
+def render_years_html(by_year: dict, config: dict, render_cache: Optional[RenderCache] = None) -> str:
+    """Render year sections (newest first) as an HTML fragment for an include."""
+    output = [SHARD_MARKER_HTML]
+    # One HTML block, so kramdown passes it through rather than parsing it as markdown
+    output.append('<div class="papers">')
+    for year in sorted(by_year.keys(), reverse=True):
+        output.append(f"<h3>{escape(str(year))}</h3>")
+
+        pubs = by_year[year]
+        pubs.sort(key=lambda x: x.entry_num or 0, reverse=True)
+
+        for pub in pubs:
+            output.append(render_cache.render(pub) if render_cache else format_entry_html(pub, config))
+    output.append('</div>')
+    return '\n'.join(output) + '\n'
+
+
+def lazy_fragment(pubs: list[Publication], config: dict) -> str:
+    """HTML fragment with one year's entries, fetched when its section is opened."""
+    config = dict(config, format='html', entry_anchors=True)
+    output = [SHARD_MARKER_HTML]
+    output.extend(format_entry_html(pub, config) for pub in pubs)
+    return '\n'.join(output) + '\n'
+
+
+def lazy_section(year, pubs: list[Publication], fragment: str) -> str:
+    """
+    Collapsed section standing in for a year that isn't inlined.
+
+    One raw HTML block, which kramdown passes through. data-entries lets
+    papers-lazy.js find the section holding an #entry-N anchor; without
+    JavaScript the link opens the fragment itself.
+    """
+    count = len(pubs)
+    url = f"{{{{ '/{Path(fragment).as_posix()}' | relative_url }}}}"
+    entries = ' '.join(str(pub.entry_num) for pub in pubs if pub.entry_num is not None)
+    return (
+        f'<details class="papers-year" id="year-{escape(str(year))}" data-src="{url}" data-entries="{entries}">'
+        f'<summary>{escape(str(year))} ({count} paper{"s" if count != 1 else ""})</summary>'
+        f'<p><a href="{url}">Show the {escape(str(year))} papers</a></p></details>'
+    )
+
+
+def split_lazy_years(by_year: dict, config: dict, pages: dict) -> tuple[dict, list[str]]:
+    """
+    Keep the newest config['lazy_years'] years inline and move the rest to fragments.
+
+    Args:
+        by_year: {year: [pubs]} from group_publications
+        config: Render config
+        pages: Generated pages, to which the fragments in LAZY_DIR are added
+
+    Returns:
+        ({year: [pubs]} to render inline, lines of collapsed sections for the other years)
+    """
+    years = sorted(by_year.keys(), reverse=True)
+    lazy = config['lazy_years']
+    sections = []
+    for year in years[lazy:]:
+        pubs = by_year[year]
+        pubs.sort(key=lambda x: x.entry_num or 0, reverse=True)
+        fragment = str(Path(LAZY_DIR) / f"{year}.html")
+        pages[fragment] = lazy_fragment(pubs, config)
+        sections.append(lazy_section(year, pubs, fragment))
+        sections.append("")
+    return {year: by_year[year] for year in years[:lazy]}, sections
+
+
+def shard_years(by_year: dict, shard_size: Optional[int] = None) -> list[tuple[str, dict]]:
+    """
+    Split grouped publications into pages, newest first.
+
+    Args:
+        by_year: {year: [pubs]} from group_publications
+        shard_size: Entries per page (None = one page per year)
+
+    Returns:
+        [(slug, {year: [pubs]})]
+    """
+    years = sorted(by_year.keys(), reverse=True)
+    for year in years:
+        by_year[year].sort(key=lambda x: x.entry_num or 0, reverse=True)
+    if not shard_size:
+        return [(str(year), {year: by_year[year]}) for year in years]
+
+    # Number pages from the oldest entry, so new papers only change the newest page
+    entries = [(year, pub) for year in reversed(years) for pub in reversed(by_year[year])]
+    shards = []
+    for n, start in enumerate(range(0, len(entries), shard_size)):
+        group = {}
+        for year, pub in reversed(entries[start:start + shard_size]):
+            group.setdefault(year, []).append(pub)
+        shards.append((f"page-{n + 1}", group))
+    return shards[::-1]
+
+
+def shard_dirs(config: dict) -> list[Path]:
+    """Directories of generated shard pages (and their HTML includes) or lazy-loaded fragments."""
+    if config.get('lazy_years'):
+        return [Path(LAZY_DIR)]
+    shard_dir = config.get('shard_dir')
+    if not shard_dir:
+        return []
+    dirs = [Path(shard_dir)]
+    if config.get('format') == 'html':
+        dirs.append(Path(INCLUDES_DIR) / Path(shard_dir).name)
+    return dirs
+
+
+def swept_files(config: dict, output_path: str) -> list[Path]:
+    """
+    Files write_pages may remove: the marked ones it didn't just write.
+
+    For the main page (DEFAULT_OUTPUT) that's every directory this script generates
+    into, whatever the current config, so switching between shards, lazy years and
+    HTML includes leaves no stale pages behind. Any other page only sweeps the
+    directories its own --shard/--lazy-years/--format html config writes to, and a
+    plain single page sweeps nothing.
+    """
+    if Path(output_path) != Path(DEFAULT_OUTPUT):
+        return [path for directory in shard_dirs(config) for path in sorted(directory.glob('*.*'))]
+    page_dirs = {Path(DEFAULT_SHARD_DIR), Path(config.get('shard_dir') or DEFAULT_SHARD_DIR)}
+    dirs = [Path(LAZY_DIR)] + sorted(page_dirs) + sorted(Path(INCLUDES_DIR) / d.name for d in page_dirs)
+    files = [path for directory in dirs for path in sorted(directory.glob('*.*'))]
+    # Top-level includes (config['include']); other includes have no marker and stay
+    files.extend(sorted(Path(INCLUDES_DIR).glob('*.html')))
+    return files
+
+
+def generated_files(config: dict, output_path: str) -> list[Path]:
+    """Every file the current config generates that exists on disk."""
+    files = [Path(output_path)]
+    if config.get('search_index'):
+        files.append(Path(config['search_index']))
+    if config.get('format') == 'html' and not config.get('shard_dir'):
+        files.append(Path(INCLUDES_DIR) / config['include'])
+    for directory in shard_dirs(config):
+        files.extend(sorted(directory.glob('*.*')))
+    files.extend(Path(EXPORT_WRITERS[name].path) for name in config.get('exports') or ())
+    return [path for path in files if path.exists()]
+
+
+def generate_pages(publications: list[Publication], config: dict, output_path: str,
+                   render_cache: Optional[RenderCache] = None) -> dict:
+    """
+    Generate every page of the papers list.
+
+    Without config['shard_dir'] that's the single page generate_markdown makes.
+    With it, output_path becomes an index linking to one page per year (or per
+    config['shard_size'] entries) in shard_dir.
+
+    With config['format'] == 'html', the entries are rendered to HTML includes
+    in _includes/ and the pages just include them, so kramdown never converts them.
+
+    With config['lazy_years'] (not combined with shard_dir), only the newest
+    years are on the page; older ones are HTML fragments in LAZY_DIR that
+    assets/papers-lazy.js loads when a visitor opens them.
+
+    With config['search_index'], the JSON search index is generated too.
+
+    Returns:
+        {path: content}, index page first
+    """
+    shard_dir = config.get('shard_dir')
+    html = config.get('format') == 'html'
+    permalink = config['permalink']
+    pages = {output_path: None}
+    # Pages in the order they're written, for the search index
+    listing = []
+
+    def body(by_year: dict, include: str) -> list[str]:
+        if not html:
+            return render_years(by_year, config, render_cache)
+        pages[str(Path(INCLUDES_DIR) / include)] = render_years_html(by_year, config, render_cache)
+        return [f"{{% include {include} %}}", ""]
+
+    if not shard_dir and not html and not config.get('lazy_years'):
+        pages[output_path] = generate_markdown(publications, config, render_cache)
+        listing.append((permalink, group_publications(publications)))
+        return add_search_index(pages, listing, config, render_cache)
+
+    by_year = group_publications(publications)
+    index = page_header(config)
+    if not shard_dir:
+        inline, sections = split_lazy_years(by_year, config, pages) if config.get('lazy_years') else (by_year, [])
+        index.extend(body(inline, config['include']))
+        index.extend(sections)
+        pages[output_path] = '\n'.join(index)
+        listing.append((permalink, by_year))
+        return add_search_index(pages, listing, config, render_cache)
+
+    for slug, group in shard_years(by_year, config.get('shard_size')):
+        shard_permalink = f"{permalink}{slug}/"
+        newest, oldest = max(group), min(group)
+        label = str(newest) if newest == oldest else f"{newest}–{oldest}"
+        count = sum(len(pubs) for pubs in group.values())
+        index.append(f"- [{label}]({shard_permalink}) ({count} paper{'s' if count != 1 else ''})")
+
+        # No title: minima lists every titled page in the site navigation
+        shard = [
+            "---",
+            "layout: page",
+            f"permalink: {shard_permalink}",
+            *search_front_matter(config),
+            "papers_shard: true",
+            "---",
+            "",
+            f"[All papers]({permalink})",
+            "",
+        ]
+        shard.extend(body(group, f"{Path(shard_dir).name}/{slug}.html"))
+        pages[str(Path(shard_dir) / f"{slug}.md")] = '\n'.join(shard)
+        listing.append((shard_permalink, group))
+
+    index.append("")
+    pages[output_path] = '\n'.join(index)
+    return add_search_index(pages, listing, config, render_cache)
+
+
+def add_search_index(pages: dict, listing: list[tuple[str, dict]], config: dict,
+                     render_cache: Optional[RenderCache] = None) -> dict:
+    """Add the search index to the generated pages, if enabled (tokens come from the render cache)."""
+    if config.get('search_index'):
+        tokens_for = render_cache.tokens if render_cache else None
+        pages[config['search_index']] = build_search_index(listing, tokens_for)
+    return pages
+
+
+def strip_tags(text: Optional[str]) -> Optional[str]:
+    """Remove HTML tags (e.g. <i> in titles)."""
+    return re.sub(r'<[^>]+>', '', text) if text else text
+
+
+def split_name(author: Author) -> tuple[str, str]:
+    """(family, given) of an author; literal names have no family name."""
+    if not author.family:
+        return '', author.name
+    return author.family, author.given
+
+
+def oa_url(pub: Publication) -> Optional[str]:
+    """The OA link shown on the page, if it isn't just the DOI."""
+    return pub.url if pub.url and 'doi.org' not in pub.url else None
+
+
+class ExportWriter:
+    """
+    One export format, written alongside the page by write_exports.
+
+    Subclasses return text for the start of the file, each publication (in
+    page order) and the end of the file; write_exports streams it to `path`.
+    """
+    path = None        # Output file, relative to the site root
+    label = None       # Link text on the page
+    download = True    # Link to the file from the page
+
+    def __init__(self, config: dict):
+        self.config = config
+        self.count = 0
+
+    def header(self) -> str:
+        return ''
+
+    def entry(self, pub: Publication) -> str:
+        raise NotImplementedError
+
+    def footer(self) -> str:
+        return ''
+
+
+class BibTeXWriter(ExportWriter):
+    """BibTeX, one @article (or @misc, without a journal) per paper."""
+    path = 'assets/papers.bib'
+    label = 'BibTeX'
+
+    _SPECIAL = re.compile(r'[&%$#_{}\\~^]')
+    _ESCAPES = {'\\': r'\textbackslash{}', '~': r'\textasciitilde{}', '^': r'\textasciicircum{}'}
+
+    def text(self, value) -> str:
+        # One pass, so the braces of \textbackslash{} aren't escaped in turn
+        return self._SPECIAL.sub(lambda m: self._ESCAPES.get(m[0], '\\' + m[0]), str(value))
+
+    def name(self, author: Author) -> str:
+        family, given = split_name(author)
+        if not family:
+            # Braced so BibTeX doesn't split e.g. a working group into names
+            return f"{{{self.text(given)}}}"
+        return f"{self.text(family)}, {self.text(given)}" if given else self.text(family)
+
+    def entry(self, pub: Publication) -> str:
+        key = re.sub(r'[^\w:.-]', '', pub.key) or f"entry{pub.entry_num}"
+        fields = [
+            ('author', ' and '.join(map(self.name, pub.authors))),
+            # Double braces keep the title's capitalisation
+            ('title', f"{{{self.text(strip_tags(pub.title))}}}" if pub.title else None),
+            ('journal', pub.container_title and self.text(pub.container_title)),
+            ('year', pub.year),
+            ('volume', pub.volume and self.text(pub.volume)),
+            ('number', pub.issue and self.text(pub.issue)),
+            ('pages', pub.page and self.text(pub.page).replace('-', '--')),
+            ('doi', pub.doi),
+            ('url', oa_url(pub)),
+        ]
+        body = ',\n'.join(f"  {name} = {{{value}}}" for name, value in fields if value)
+        kind = 'article' if pub.container_title else 'misc'
+        return f"@{kind}{{{key},\n{body}\n}}\n\n"
+
+
+class RISWriter(ExportWriter):
+    """RIS, as imported by Zotero, EndNote and Mendeley."""
+    path = 'assets/papers.ris'
+    label = 'RIS'
+
+    def entry(self, pub: Publication) -> str:
+        lines = [('TY', 'JOUR' if pub.container_title else 'GEN')]
+        for author in pub.authors:
+            family, given = split_name(author)
+            lines.append(('AU', f"{family}, {given}" if family and given else family or given))
+        lines.append(('TI', strip_tags(pub.title)))
+        lines.append(('JO', pub.container_title))
+        lines.append(('PY', pub.year))
+        lines.append(('VL', pub.volume))
+        lines.append(('IS', pub.issue))
+        if pub.page:
+            start, _, end = pub.page.partition('-')
+            lines.append(('SP', start))
+            lines.append(('EP', end))
+        lines.append(('DO', pub.doi))
+        lines.append(('UR', oa_url(pub)))
+        lines.append(('ER', ''))
+        return ''.join(f"{tag}  - {value}\n" for tag, value in lines if value or tag == 'ER') + '\n'
+
+
+class JSONLDWriter(ExportWriter):
+    """
+    schema.org ScholarlyArticle list for search engines.
+
+    Written to an include that _layouts/page.html embeds in a JSON-LD script
+    tag, so it's escaped to survive both Liquid and the HTML parser.
+    """
+    path = f'{INCLUDES_DIR}/papers.jsonld'
+    label = 'JSON-LD'
+    download = False
+
+    def header(self) -> str:
+        return '{"@context":"https://schema.org","@graph":[\n'
+
+    def entry(self, pub: Publication) -> str:
+        item = {'@type': 'ScholarlyArticle', 'name': strip_tags(pub.title)}
+        if pub.authors:
+            item['author'] = [
+                {'@type': 'Person' if author.family else 'Organization', 'name': author.name}
+                for author in pub.authors
+            ]
+        if pub.year:
+            item['datePublished'] = str(pub.year)
+        if pub.container_title:
+            item['isPartOf'] = {'@type': 'Periodical', 'name': pub.container_title}
+        if pub.volume:
+            item['volumeNumber'] = pub.volume
+        if pub.issue:
+            item['issueNumber'] = pub.issue
+        if pub.page:
+            item['pagination'] = pub.page
+        if pub.doi:
+            item['sameAs'] = f"https://doi.org/{pub.doi}"
+        if oa_url(pub):
+            item['url'] = oa_url(pub)
+        text = json.dumps(item, ensure_ascii=False, separators=(',', ':'))
+        # '{{', '{%' and '<' only occur inside strings, where the escapes are equivalent
+        text = text.replace('<', '\\u003c').replace('{{', '{\\u007b').replace('{%', '{\\u0025')
+        return (',\n' if self.count else '') + text
+
+    def footer(self) -> str:
+        return '\n]}\n'
+
+
+# Formats for --export
+EXPORT_WRITERS = {
+    'bibtex': BibTeXWriter,
+    'ris': RISWriter,
+    'jsonld': JSONLDWriter,
+}
+
+
+def write_exports(publications: list[Publication], config: dict) -> dict:
+    """
+    Write every format in config['exports'] in one pass over the publications.
+
+    Publications are grouped and ordered as on the page, and each one is handed
+    to every writer in turn. Each file is streamed to a temporary file and only
+    replaces the old one if its content changed.
+
+    Returns:
+        {'written': n, 'unchanged': n}
+    """
+    stats = {'written': 0, 'unchanged': 0}
+    writers = [EXPORT_WRITERS[name](config) for name in config.get('exports') or ()]
+    if not writers:
+        return stats
+
+    by_year = group_publications(publications)
+    temporary = [Path(f"{writer.path}.tmp") for writer in writers]
+    with ExitStack() as stack:
+        files = []
+        for writer, path in zip(writers, temporary):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            files.append(stack.enter_context(open(path, 'w', encoding='utf-8')))
+            files[-1].write(writer.header())
+
+        for year in sorted(by_year.keys(), reverse=True):
+            pubs = by_year[year]
+            pubs.sort(key=lambda x: x.entry_num or 0, reverse=True)
+            for pub in pubs:
+                for writer, f in zip(writers, files):
+                    f.write(writer.entry(pub))
+                    writer.count += 1
+
+        for writer, f in zip(writers, files):
+            f.write(writer.footer())
+
+    for writer, path in zip(writers, temporary):
+        target = Path(writer.path)
+        if target.exists() and target.read_bytes() == path.read_bytes():
+            path.unlink()
+            stats['unchanged'] += 1
+            continue
+        print(f"Writing {target} ({writer.count} entries)...")
+        path.replace(target)
+        stats['written'] += 1
+
+    print(f"  {stats['written']} export(s) written, {stats['unchanged']} unchanged")
+    return stats
+
+
+def add_render_arguments(parser: argparse.ArgumentParser):
+    """Add the rendering options shared with papers_pipeline.py."""
+    parser.add_argument(
+        '--highlight',
+        default=DEFAULT_CONFIG['highlight_author'],
+        help=f"Author surname to bold (default: {DEFAULT_CONFIG['highlight_author']})"
+    )
+    parser.add_argument(
+        '--no-citations',
+        action='store_true',
+        help='Hide citation counts'
+    )
+    parser.add_argument(
+        '--no-oa-links',
+        action='store_true',
+        help='Hide Open Access links'
+    )
+    parser.add_argument(
+        '--max-authors',
+        type=int,
+        default=None,
+        help='Maximum authors before "et al." (default: show all)'
+    )
+    parser.add_argument(
+        '--render-cache',
+        nargs='?',
+        const=RENDER_CACHE_FILE,
+        metavar='FILE',
+        help=f'Reuse unchanged entries from a cache of rendered entries (default file: {RENDER_CACHE_FILE})'
+    )
+    parser.add_argument(
+        '--format',
+        choices=('markdown', 'html'),
+        default=DEFAULT_CONFIG['format'],
+        help='Render entries as markdown in the page, or as HTML in an _includes/ file the page '
+             'includes, which Jekyll doesn\'t have to convert (default: markdown)'
+    )
+    parser.add_argument(
+        '--include',
+        default=DEFAULT_CONFIG['include'],
+        metavar='NAME',
+        help=f"Include file written by --format html, in {INCLUDES_DIR}/ (default: {DEFAULT_CONFIG['include']})"
+    )
+    parser.add_argument(
+        '--search-index',
+        nargs='?',
+        const=DEFAULT_SEARCH_INDEX,
+        metavar='FILE',
+        help=f'Also write a search index for the search box on the page (default file: {DEFAULT_SEARCH_INDEX})'
+    )
+    parser.add_argument(
+        '--shard',
+        nargs='?',
+        const=DEFAULT_SHARD_DIR,
+        metavar='DIR',
+        help=f'Write one page per year into DIR and make the output an index of them (default dir: {DEFAULT_SHARD_DIR})'
+    )
+    parser.add_argument(
+        '--shard-size',
+        type=int,
+        metavar='N',
+        help='Shard into pages of N entries instead of one per year (implies --shard)'
+    )
+    parser.add_argument(
+        '--lazy-years',
+        type=int,
+        metavar='N',
+        help=f'Put only the newest N years on the page; older years go in {LAZY_DIR}/ and load when opened'
+    )
+    parser.add_argument(
+        '--export',
+        action='append',
+        choices=sorted(EXPORT_WRITERS),
+        default=[],
+        metavar='FORMAT',
+        help='Also write the list as FORMAT: ' + ', '.join(
+            f"{name} ({writer.path})" for name, writer in EXPORT_WRITERS.items()
+        ) + '; repeat for several'
+    )
+
+
+def check_render_arguments(args: argparse.Namespace) -> Optional[str]:
+    """Validate options added by add_render_arguments; return an error message or None."""
+    if args.lazy_years is not None and args.lazy_years < 1:
+        return "--lazy-years must be at least 1"
+    if args.shard_size is not None and args.shard_size < 1:
+        return "--shard-size must be at least 1"
+    if args.lazy_years and (args.shard or args.shard_size):
+        return "--lazy-years can't be combined with --shard or --shard-size"
+    return None
+
+
+def build_config(args: argparse.Namespace) -> dict:
+    """Render config from DEFAULT_CONFIG and options added by add_render_arguments."""
+    config = DEFAULT_CONFIG.copy()
+    config['highlight_author'] = args.highlight
+    config['show_citations'] = not args.no_citations
+    config['show_oa_links'] = not args.no_oa_links
+    config['max_authors'] = args.max_authors
+    config['format'] = args.format
+    config['search_index'] = args.search_index
+    config['include'] = args.include
+    config['shard_dir'] = args.shard or (DEFAULT_SHARD_DIR if args.shard_size else None)
+    config['shard_size'] = args.shard_size
+    config['lazy_years'] = args.lazy_years
+    config['entry_anchors'] = bool(args.lazy_years)
+    # Writer order, so the page's download links don't depend on the option order
+    config['exports'] = tuple(name for name in EXPORT_WRITERS if name in args.export)
+    return config
+
+
+def write_markdown(markdown: str, output_path: str):
+    """Write the generated page."""
+    print(f"Writing {output_path}...")
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(markdown)
+
+
+def is_shard_page(path: Path) -> bool:
+    """True if a file is marked as a generated shard page, include or fragment."""
+    # errors='replace': the directories swept may hold other, binary files
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        first = f.readline().strip()
+        if first == SHARD_MARKER_HTML:
+            return True
+        if first != '---':
+            return False
+        for line in f:
+            if line.strip() == '---':
+                return False
+            if line.strip() == 'papers_shard: true':
+                return True
+    return False
+
+
+def write_pages(pages: dict, config: dict, sweep: bool = True) -> dict:
+    """
+    Write generated pages, leaving files whose content hasn't changed untouched.
+
+    With sweep, leftover generated pages, includes and fragments (e.g. for a year
+    with no papers left, or from a previous shard/lazy/html config) are removed.
+
+    Returns:
+        {'written': n, 'unchanged': n, 'removed': n}
+    """
+    stats = {'written': 0, 'unchanged': 0, 'removed': 0}
+
+    for path, content in pages.items():
+        target = Path(path)
+        if target.exists() and target.read_text(encoding='utf-8') == content:
+            stats['unchanged'] += 1
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        write_markdown(content, path)
+        stats['written'] += 1
+
+    # The index page comes first (generate_pages)
+    for path in swept_files(config, next(iter(pages))) if sweep else ():
+        if str(path) in pages:
+            continue
+        try:
+            # Only remove pages this script generated
+            if is_shard_page(path):
+                print(f"Removing {path}...")
+                path.unlink()
+                stats['removed'] += 1
+        except FileNotFoundError:
+            # Removed by another run in the meantime
+            continue
+
+    print(f"  {stats['written']} page(s) written, {stats['unchanged']} unchanged, {stats['removed']} removed")
+    return stats
 
 
 def main():
@@ -267,6 +1163,14 @@ Examples:
   python generate_papers_md.py
   python generate_papers_md.py -i my_pubs.json -o my_papers.md
   python generate_papers_md.py --no-citations
+  python generate_papers_md.py --enrichment other_enrichment.json
+  python generate_papers_md.py --shard
+  python generate_papers_md.py --shard-size 50
+  python generate_papers_md.py --format html
+  python generate_papers_md.py --search-index
+  python generate_papers_md.py --lazy-years 5
+  python generate_papers_md.py --export bibtex --export ris --export jsonld
+  python enrich_from_openalex.py --stream | python generate_papers_md.py --enrichment -
         """
     )
 
@@ -281,26 +1185,17 @@ Examples:
         help=f'Output markdown file (default: {DEFAULT_OUTPUT})'
     )
     parser.add_argument(
-        '--highlight',
-        default=DEFAULT_CONFIG['highlight_author'],
-        help=f"Author surname to bold (default: {DEFAULT_CONFIG['highlight_author']})"
-    )
-    parser.add_argument(
-        '--no-citations',
-        action='store_true',
-        help='Hide citation counts'
+        '--enrichment',
+        default=DEFAULT_ENRICHMENT,
+        help=f'Enrichment sidecar from enrich_from_openalex.py (default: {DEFAULT_ENRICHMENT}, skipped if missing); '
+             f'"-" or a .ndjson file reads a --stream sidecar, rendering entries as they arrive'
     )
     parser.add_argument(
-        '--no-oa-links',
+        '--no-enrichment',
         action='store_true',
-        help='Hide Open Access links'
-    )
-    parser.add_argument(
-        '--max-authors',
-        type=int,
-        default=None,
-        help='Maximum authors before "et al." (default: show all)'
+        help='Ignore the enrichment sidecar'
     )
+    add_render_arguments(parser)
 
     args = parser.parse_args()
 
@@ -309,24 +1204,56 @@ Examples:
         print(f"Error: Input file not found: {args.input}", file=sys.stderr)
         sys.exit(1)
 
-    # Build config
-    config = DEFAULT_CONFIG.copy()
-    config['highlight_author'] = args.highlight
-    config['show_citations'] = not args.no_citations
-    config['show_oa_links'] = not args.no_oa_links
-    config['max_authors'] = args.max_authors
+    error = check_render_arguments(args)
+    if error:
+        print(f"Error: {error}", file=sys.stderr)
+        sys.exit(1)
+
+    # A missing default sidecar just means no enrichment has been run yet
+    stream = not args.no_enrichment and is_enrichment_stream(args.enrichment)
+    use_enrichment = not args.no_enrichment and (args.enrichment == '-' or Path(args.enrichment).exists())
+    if not args.no_enrichment and not use_enrichment and args.enrichment != DEFAULT_ENRICHMENT:
+        print(f"Error: Enrichment file not found: {args.enrichment}", file=sys.stderr)
+        sys.exit(1)
+
+    config = build_config(args)
 
     # Load and process
     print(f"Reading {args.input}...")
-    publications = load_csl_json(args.input)
-    print(f"  Found {len(publications)} publications")
+    load_stats = {}
+    publications = load_publications(args.input, RENDER_FIELDS, load_stats)
+    print(f"  Found {len(publications)} publications, {describe_skipped(load_stats)}")
+
+    render_cache = RenderCache(args.render_cache, config) if args.render_cache else None
+    if stream:
+        print(f"Rendering entries from {'stdin' if args.enrichment == '-' else args.enrichment} as they arrive...")
+        streaming = StreamingRender(publications, config, render_cache)
+        with ExitStack() as stack:
+            lines = sys.stdin if args.enrichment == '-' else stack.enter_context(
+                open(args.enrichment, 'r', encoding='utf-8'))
+            try:
+                for key, fields in iter_enrichment_stream(lines):
+                    streaming.add(key, fields)
+            except ValueError as e:
+                # Nothing has been written yet; keep the last complete page
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        publications, streamed = streaming.finish()
+        print(f"  {len(streamed.entries)} entries rendered from the stream")
+    elif use_enrichment:
+        print(f"Joining {args.enrichment}...")
+        enrichment = load_enrichment(args.enrichment)
+        publications = join_enrichment(publications, enrichment)
+        print(f"  {len(enrichment)} enriched entries")
 
     print(f"Generating markdown...")
-    markdown = generate_markdown(publications, config)
+    pages = generate_pages(publications, config, args.output, streamed if stream else render_cache)
+    if render_cache:
+        render_cache.save()
+        print(f"  Render cache: {render_cache.summary()}")
 
-    print(f"Writing {args.output}...")
-    with open(args.output, 'w', encoding='utf-8') as f:
-        f.write(markdown)
+    write_pages(pages, config)
+    write_exports(publications, config)
 
     print(f"Done! Generated {args.output}")
 
@@ -0,0 +1,307 @@
+"""
+Shared HTTP client for OpenAlex lookups.
+
+Used by enrich_from_openalex.py and _archive/verify_publications.py so every
+request goes through one keep-alive connection pool with the same retry policy:
+
+  - 429 and 5xx responses and connection errors are retried with bounded
+    exponential backoff, honouring any Retry-After header
+  - connecting and reading have separate timeouts, so an unreachable host
+    fails in seconds while a slow but working one still gets time to answer
+  - after BREAKER_THRESHOLD attempts in a row fail (connection errors,
+    timeouts, 5xx), a circuit breaker trips and every later request fails
+    immediately with OpenAlexUnavailable, as does any request once the run's
+    deadline (start_run) has passed
+  - with an AdaptiveConcurrency attached, every attempt's latency, status and
+    rate-limit headers feed an AIMD limit on how many lookups are in flight
+  - responses are requested gzip-compressed
+  - per-run stats (requests, retries, new vs reused connections) are kept for
+    the end-of-run summary
+
+requests is only imported when an OpenAlexClient is created, so importing this
+module for its defaults (as papers_pipeline.py does via enrich_from_openalex.py)
+costs nothing on runs that fetch nothing.
+"""
+
+import contextlib
+import email.utils
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+MAX_RETRIES = 4  # retries after the first attempt
+BACKOFF_BASE = 1.0  # seconds before the first retry, doubled each time
+MAX_BACKOFF = 30.0  # upper bound on any single wait, including Retry-After
+POOL_SIZE = 16  # keep-alive connections per host
+CONNECT_TIMEOUT = 5.0  # seconds to establish a connection
+READ_TIMEOUT = 30.0  # seconds to wait for the response once connected
+BREAKER_THRESHOLD = 8  # failed attempts in a row (across requests) before the breaker trips
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# AdaptiveConcurrency tuning
+BACKOFF_FACTOR = 0.5  # multiply the limit by this on a 429, 5xx or connection error
+LATENCY_FACTOR = 0.9  # ... and by this when latency has more than doubled
+LATENCY_TOLERANCE = 2.0  # smoothed latency over the best seen that counts as congestion
+LATENCY_SMOOTHING = 0.3  # weight of each new sample in the smoothed latency
+RATE_LIMIT_HEADER = 'X-RateLimit-Remaining'
+
+
+class OpenAlexUnavailable(OSError):
+    """
+    Request not sent: the circuit breaker has tripped or the deadline has passed.
+
+    An OSError, as requests.RequestException is, so it is handled like a failed request.
+    """
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on the number of requests in flight.
+
+    OpenAlexClient.get holds a slot() for each attempt, so a retry waits for
+    room under the current limit, and reports the outcome to observe(). The
+    limit grows by one per round of requests while
+    latency stays close to the best seen, and shrinks multiplicatively when
+    OpenAlex throttles (429), errors (5xx, connection failures), reports few
+    requests left in its rate-limit window, or slows down. Decreases happen at
+    most once per round, so a burst of failures from requests that were already
+    in flight only counts once. Changes are reported through `log`.
+    """
+
+    def __init__(self, initial: int = 1, maximum: int = 8, log: Optional[Callable[[str], None]] = None):
+        self.maximum = max(1, maximum)
+        self.limit = float(min(max(1, initial), self.maximum))
+        self.log = log
+        self.in_flight = 0
+        self.best_latency = None
+        self.latency = None  # smoothed
+        self.hold_until = 0.0  # no further decrease before this time
+        self.peak = int(self.limit)
+        self.condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Wait until fewer than `limit` requests are in flight, and hold a slot meanwhile."""
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    def _set(self, limit: float, reason: str):
+        # Called with the condition held
+        old = int(self.limit)
+        self.limit = min(float(self.maximum), max(1.0, limit))
+        new = int(self.limit)
+        self.peak = max(self.peak, new)
+        if new != old:
+            if self.log:
+                self.log(f"Concurrency {old} -> {new} ({reason})")
+            self.condition.notify_all()
+
+    def observe(self, latency: Optional[float], status: Optional[int], headers=None):
+        """Adjust the limit after one attempt (status None = connection error or timeout)."""
+        now = time.monotonic()
+        with self.condition:
+            if status is None or status in RETRY_STATUSES:
+                if status == 429 and self.log:
+                    self.log(f"Throttled (429) at concurrency {int(self.limit)}")
+                if now >= self.hold_until:
+                    self._set(self.limit * BACKOFF_FACTOR, f"HTTP {status}" if status else "connection error")
+                    self.hold_until = now + (self.latency or 1.0)
+                return
+
+            if self.latency is None:
+                self.latency = latency
+            else:
+                self.latency += LATENCY_SMOOTHING * (latency - self.latency)
+            if self.best_latency is None or latency < self.best_latency:
+                self.best_latency = latency
+
+            remaining = (headers or {}).get(RATE_LIMIT_HEADER)
+            if remaining is not None and remaining.isdigit() and int(remaining) < self.limit:
+                # Don't have more requests in flight than the window has left
+                self._set(int(remaining), f"{remaining} requests left in the rate-limit window")
+                return
+
+            if self.latency > LATENCY_TOLERANCE * self.best_latency:
+                if now >= self.hold_until:
+                    self._set(self.limit * LATENCY_FACTOR,
+                              f"latency {self.latency * 1000:.0f} ms, best {self.best_latency * 1000:.0f} ms")
+                    self.hold_until = now + self.latency
+                return
+
+            # Additive increase: about one more slot per round of `limit` requests
+            self._set(self.limit + 1 / self.limit, f"latency {self.latency * 1000:.0f} ms")
+
+    def summary(self) -> str:
+        return f"concurrency {int(self.limit)} (peak {self.peak}, max {self.maximum})"
+
+
+class OpenAlexClient:
+    """Pooled, retrying HTTP client with per-run stats."""
+
+    def __init__(self, mailto: Optional[str] = None, max_retries: int = MAX_RETRIES,
+                 pool_size: int = POOL_SIZE, connect_timeout: float = CONNECT_TIMEOUT,
+                 read_timeout: float = READ_TIMEOUT, breaker_threshold: int = BREAKER_THRESHOLD):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.max_retries = max_retries
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.breaker_threshold = breaker_threshold
+        self.failures = 0  # attempts in a row that failed
+        self.unavailable = None  # why requests are no longer sent, once they aren't
+        self.deadline = None  # time.monotonic() after which no request is sent
+        self.concurrency = None  # AdaptiveConcurrency fed by every attempt, if set
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip'
+        if mailto:
+            # Identifies us for the OpenAlex polite pool
+            self.session.headers['User-Agent'] = f"katiito.github.io (mailto:{mailto})"
+        self.lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'retries': 0,
+            'throttled': 0,
+            'errors': 0,
+        }
+        self.pool_baseline = (0, 0)  # connection_stats() when the run started
+
+    def _count(self, key: str):
+        with self.lock:
+            self.stats[key] += 1
+
+    def start_run(self, deadline: Optional[float] = None):
+        """
+        Close the circuit breaker, give the run `deadline` seconds (None = no limit)
+        and start counting requests and connections afresh for its summary.
+        """
+        with self.lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+            self.pool_baseline = self.connection_stats()
+            self.failures = 0
+            self.unavailable = None
+            self.concurrency = None
+            self.deadline = time.monotonic() + deadline if deadline is not None else None
+
+    def _check_available(self) -> Optional[float]:
+        """Raise OpenAlexUnavailable if no more requests may be sent; return seconds left before the deadline."""
+        with self.lock:
+            if self.unavailable is None and self.deadline is not None and time.monotonic() >= self.deadline:
+                self.unavailable = "deadline reached"
+            if self.unavailable:
+                raise OpenAlexUnavailable(self.unavailable)
+            return self.deadline - time.monotonic() if self.deadline is not None else None
+
+    def _record(self, failed: Optional[bool]):
+        # failed=None (throttled) says the server is up but not whether it's healthy
+        if failed is None:
+            return
+        with self.lock:
+            self.failures = self.failures + 1 if failed else 0
+            if self.failures >= self.breaker_threshold and not self.unavailable:
+                self.unavailable = f"circuit breaker open after {self.failures} failed attempts in a row"
+
+    def get(self, url: str, params: Optional[dict] = None) -> 'requests.Response':
+        """
+        GET a URL, retrying throttled, failed and 5xx requests.
+
+        Returns the final response, which may still be a 429/5xx once retries run
+        out. Raises requests.RequestException if the last attempt failed outright,
+        and OpenAlexUnavailable without sending anything once the circuit breaker
+        has tripped or the deadline has passed.
+        """
+        import requests
+
+        attempt = 0
+        while True:
+            remaining = self._check_available()
+            read_timeout = self.read_timeout if remaining is None else max(0.1, min(self.read_timeout, remaining))
+            self._count('requests')
+            try:
+                with self.concurrency.slot() if self.concurrency else contextlib.nullcontext():
+                    sent = time.monotonic()
+                    response = self.session.get(url, params=params, timeout=(self.connect_timeout, read_timeout))
+            except requests.RequestException:
+                self._count('errors')
+                self._record(failed=True)
+                if self.concurrency:
+                    self.concurrency.observe(None, None)
+                if attempt == self.max_retries:
+                    raise
+                wait = None
+            else:
+                self._record(None if response.status_code == 429 else response.status_code in RETRY_STATUSES)
+                if self.concurrency:
+                    self.concurrency.observe(time.monotonic() - sent, response.status_code, response.headers)
+                if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                if response.status_code == 429:
+                    self._count('throttled')
+                wait = parse_retry_after(response.headers.get('Retry-After'))
+
+            if wait is None:
+                wait = BACKOFF_BASE * 2 ** attempt
+            wait = min(wait, MAX_BACKOFF)
+            remaining = self._check_available()
+            if remaining is not None and wait >= remaining:
+                # This retry would start after the deadline; others with shorter waits
+                # still have time, so only _check_available stops the whole client
+                raise OpenAlexUnavailable(f"retry in {wait:.1f}s would pass the deadline")
+            self._count('retries')
+            time.sleep(wait)
+            attempt += 1
+
+    def connection_stats(self) -> tuple[int, int]:
+        """Return (connections opened, requests sent) across all pooled hosts."""
+        opened = sent = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+                    sent += pool.num_requests
+        return opened, sent
+
+    def summary(self) -> str:
+        """One-line description of this run's HTTP activity."""
+        opened, sent = self.connection_stats()
+        opened -= self.pool_baseline[0]
+        sent -= self.pool_baseline[1]
+        summary = (f"{self.stats['requests']} requests, {self.stats['retries']} retries "
+                   f"({self.stats['throttled']} throttled, {self.stats['errors']} errors), "
+                   f"{opened} connections opened, {max(0, sent - opened)} reused")
+        if self.concurrency:
+            summary += f", {self.concurrency.summary()}"
+        if self.unavailable:
+            summary += f"; stopped: {self.unavailable}"
+        return summary
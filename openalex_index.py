@@ -0,0 +1,151 @@
+"""
+Local DOI index built from an OpenAlex snapshot, for enrichment without network access.
+
+The OpenAlex snapshot ships works as gzipped JSON Lines partitions
+(data/works/updated_date=YYYY-MM-DD/part_NNN.gz). ingest_snapshot streams them
+line by line into a SQLite table keyed by DOI, keeping only the fields
+enrich_from_openalex.py caches, so memory use stays flat however large the input.
+lookup_works then answers batches of DOIs with indexed queries and no HTTP.
+"""
+
+import gzip
+import json
+import sqlite3
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from csl_json import canonical_doi
+
+INGEST_CHUNK = 10000  # rows per INSERT batch
+LOOKUP_CHUNK = 500  # DOIs per SELECT (SQLite's default variable limit is 999+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS works (
+    doi TEXT PRIMARY KEY,
+    openalex_id TEXT,
+    cited_by_count INTEGER,
+    open_access TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS partitions (
+    path TEXT PRIMARY KEY,
+    size INTEGER,
+    works INTEGER
+);
+"""
+
+
+def index_key(doi: str) -> str:
+    """DOIs are stored in canonical form (lowercase, no https://doi.org/ prefix)."""
+    return canonical_doi(doi)
+
+
+def open_index(index_path: str) -> sqlite3.Connection:
+    """Open (creating if needed) the index database."""
+    conn = sqlite3.connect(index_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def find_partitions(paths: Iterable[str]) -> list[Path]:
+    """Expand files and directories into .gz partitions, oldest updated_date first."""
+    found = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            found.extend(path.rglob('*.gz'))
+        else:
+            found.append(path)
+    # Later partitions hold newer versions of a work, so they must be applied last
+    return sorted(found, key=lambda p: (p.parent.name, p.name))
+
+
+def iter_partition(path: Path) -> Iterator[tuple]:
+    """Stream (doi, id, cited_by_count, open_access) rows from one partition."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            work = json.loads(line)
+            doi = work.get('doi')
+            if not doi:
+                continue
+            yield (
+                index_key(doi),
+                work.get('id'),
+                work.get('cited_by_count', 0),
+                json.dumps(work.get('open_access') or {}),
+            )
+
+
+def ingest_snapshot(paths: Iterable[str], index_path: str) -> dict:
+    """
+    Load snapshot partitions into the index, skipping ones already ingested.
+
+    Returns:
+        {'partitions': n ingested, 'skipped': n unchanged, 'works': rows written}
+    """
+    conn = open_index(index_path)
+    # Bulk load: the index can always be rebuilt from the snapshot
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+
+    stats = {'partitions': 0, 'skipped': 0, 'works': 0}
+    partitions = find_partitions(paths)
+    for n, path in enumerate(partitions):
+        size = path.stat().st_size
+        done = conn.execute('SELECT size FROM partitions WHERE path = ?', (str(path),)).fetchone()
+        if done and done[0] == size:
+            stats['skipped'] += 1
+            continue
+
+        print(f"  [{n+1}/{len(partitions)}] {path}...", end=' ', flush=True)
+        count = 0
+        chunk = []
+        for row in iter_partition(path):
+            chunk.append(row)
+            if len(chunk) >= INGEST_CHUNK:
+                conn.executemany('INSERT OR REPLACE INTO works VALUES (?, ?, ?, ?)', chunk)
+                count += len(chunk)
+                chunk = []
+        conn.executemany('INSERT OR REPLACE INTO works VALUES (?, ?, ?, ?)', chunk)
+        count += len(chunk)
+        conn.execute('INSERT OR REPLACE INTO partitions VALUES (?, ?, ?)', (str(path), size, count))
+        conn.commit()
+        print(f"{count} works")
+
+        stats['partitions'] += 1
+        stats['works'] += count
+
+    conn.close()
+    return stats
+
+
+def lookup_works(conn: sqlite3.Connection, dois: list[str]) -> dict:
+    """
+    Look DOIs up in the index.
+
+    Returns:
+        {input DOI: work dict shaped like an OpenAlex API response} for DOIs found
+    """
+    by_key = {}
+    for doi in dois:
+        by_key.setdefault(index_key(doi), []).append(doi)
+
+    found = {}
+    keys = list(by_key)
+    for i in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[i:i + LOOKUP_CHUNK]
+        placeholders = ','.join('?' * len(chunk))
+        rows = conn.execute(
+            f'SELECT doi, openalex_id, cited_by_count, open_access FROM works WHERE doi IN ({placeholders})',
+            chunk
+        )
+        for key, openalex_id, cited_by_count, open_access in rows:
+            work = {
+                'id': openalex_id,
+                'doi': f"https://doi.org/{key}",
+                'cited_by_count': cited_by_count,
+                'open_access': json.loads(open_access),
+            }
+            for doi in by_key[key]:
+                found[doi] = work
+    return found
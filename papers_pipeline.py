@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+"""
+Update papers.md from the Zotero export in a single process.
+
+Loads papers_zotero.json once, enriches it with OpenAlex citation counts in
+memory and renders papers.md directly, formatting each entry as soon as its
+lookup resolves. The enrichment sidecar (papers_enrichment.json) is only
+written when asked for.
+
+Each successful update records fingerprints of its inputs, options, code and
+outputs in .papers_update_state.json, along with the time the first cached
+citation count it used goes stale. If none of those have changed by the next
+run, it exits without touching any file (so Jekyll doesn't rebuild the page).
+
+With --watch it keeps running, and each time Better BibTeX rewrites the export
+it re-enriches and re-renders just the records that changed, keeping the
+library, enrichment and rendered entries in memory between passes.
+
+The batch command does the same for many researchers at once from a manifest
+of profiles. DOIs are deduplicated across every export so each is looked up
+once, in one shared cache, and the pages are rendered in a process pool.
+
+Usage:
+  python papers_pipeline.py update                       # papers_zotero.json → papers.md
+  python papers_pipeline.py update --write-enrichment    # Also write papers_enrichment.json
+  python papers_pipeline.py update --max-age 30          # Any enrich_from_openalex.py option
+  python papers_pipeline.py update --force               # Run even if nothing has changed
+  python papers_pipeline.py update --watch               # Regenerate on every export
+  python papers_pipeline.py batch profiles.json          # Many researchers, one shared cache
+
+From Python:
+  from papers_pipeline import run_update
+  run_update(enrich={'max_age': 30})
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+import enrich_from_openalex
+import generate_papers_md
+import csl_json
+import papers_search
+from csl_json import RENDER_FIELDS, describe_skipped, load_publications
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # optional; --watch polls without it
+    Observer = None
+
+STATE_FILE = '.papers_update_state.json'  # fingerprints of the last successful update
+POLL_INTERVAL = 0.25  # seconds between checks of the export in --watch mode
+SETTLE_TIME = 0.2  # seconds the export must be unchanged before a pass starts
+
+# Options that change how lookups are made but not what they return
+UNFINGERPRINTED_OPTIONS = {'refresh', 'batch_size', 'concurrency', 'max_concurrency', 'rate', 'deadline',
+                           'connect_timeout', 'read_timeout'}
+
+# Render options that write site-wide files, which profiles in a batch would overwrite
+SITE_WIDE_OPTIONS = ('format', 'search_index', 'shard', 'shard_size', 'lazy_years', 'export', 'render_cache')
+
+
+def file_digest(path: Optional[str]) -> Optional[str]:
+    """SHA-256 of a file's contents, or None if there's no such file."""
+    if not path or not Path(path).exists():
+        return None
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def fingerprint(input_path: str, output_path: str, cache_path: str, config: dict,
+                enrichment_path: Optional[str], enrich: dict) -> dict:
+    """
+    Fingerprint everything an update's outputs depend on.
+
+    The outputs themselves are included so that a hand-edited or deleted
+    papers.md (or shard page or include) is regenerated.
+    """
+    options = {k: v for k, v in enrich.items() if k not in UNFINGERPRINTED_OPTIONS}
+    index = options.get('offline_index')
+    if index:
+        # The index can be gigabytes; its size and mtime change whenever it is re-ingested
+        stat = Path(index).stat()
+        options['offline_index'] = [index, stat.st_size, stat.st_mtime_ns]
+    modules = (csl_json, enrich_from_openalex, generate_papers_md, papers_search, sys.modules[__name__])
+    outputs = generate_papers_md.generated_files(config, output_path)
+    if enrichment_path:
+        outputs.append(enrichment_path)
+    current = {
+        'input': file_digest(input_path),
+        'cache': file_digest(cache_path),
+        'config': config,
+        'enrich': options,
+        'code': {Path(m.__file__).name: file_digest(m.__file__) for m in modules},
+        'outputs': {str(path): file_digest(path) for path in outputs},
+    }
+    # As it will read back from the state file (tuples become lists)
+    return json.loads(json.dumps(current))
+
+
+def load_state(state_path: str) -> dict:
+    """Load the state recorded by the last successful update ({} if none)."""
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def is_up_to_date(state: dict, current: dict, cache_path: str) -> bool:
+    """True if nothing has changed since `state` was recorded and no cached entry has gone stale."""
+    if state.get('fingerprint') != current:
+        return False
+    # An interrupted run left lookups that haven't been folded into the cache yet
+    if enrich_from_openalex.journal_path(cache_path).exists():
+        return False
+    expires = state.get('expires')
+    return expires is None or datetime.now(timezone.utc) < datetime.fromisoformat(expires)
+
+
+def save_state(state_path: str, current: dict, expires: Optional[datetime]):
+    """Record a successful update."""
+    state = {
+        'fingerprint': current,
+        'expires': expires.isoformat() if expires else None,
+    }
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+
+
+def record_state(state_path: str, publications: list, input_path: str, output_path: str,
+                 cache_path: str, config: dict, enrichment_path: Optional[str], enrich: dict):
+    """Fingerprint a successful update, whose cache and outputs have just been rewritten."""
+    cache = enrich_from_openalex.load_cache(cache_path)
+    expires = enrich_from_openalex.next_expiry(
+        cache, [csl_json.canonical_doi(pub.doi) for pub in publications if pub.doi],
+        enrich.get('max_age', enrich_from_openalex.MAX_AGE_DAYS),
+        enrich.get('negative_max_age', enrich_from_openalex.NEGATIVE_MAX_AGE_DAYS),
+    )
+    current = fingerprint(input_path, output_path, cache_path, config, enrichment_path, enrich)
+    save_state(state_path, current, expires)
+
+
+def run_update(input_path: str = generate_papers_md.DEFAULT_INPUT,
+               output_path: str = generate_papers_md.DEFAULT_OUTPUT,
+               cache_path: str = enrich_from_openalex.CACHE_FILE,
+               config: Optional[dict] = None,
+               enrichment_path: Optional[str] = None,
+               enrich: Optional[dict] = None,
+               force: bool = False,
+               state_path: Optional[str] = STATE_FILE,
+               render_cache_path: Optional[str] = None) -> Optional[str]:
+    """
+    Load, enrich and render in one pass, unless nothing has changed since the last run.
+
+    Args:
+        input_path: CSL-JSON export
+        output_path: Markdown page to write
+        cache_path: OpenAlex cache file
+        config: Render config (default: generate_papers_md.DEFAULT_CONFIG)
+        enrichment_path: Also write the enrichment sidecar here (None = don't)
+        enrich: Keyword arguments for enrich_from_openalex.enrich()
+        force: Run even if the last run's fingerprints still match
+        state_path: Where fingerprints are kept (None = always run, record nothing)
+        render_cache_path: Cache of rendered entries (None = render every entry)
+
+    Returns:
+        The generated markdown (the index page when sharding), or None if the run was skipped
+    """
+    config = config or generate_papers_md.DEFAULT_CONFIG
+    enrich = enrich or {}
+
+    if state_path:
+        state = load_state(state_path)
+        current = fingerprint(input_path, output_path, cache_path, config, enrichment_path, enrich)
+        if not force and not enrich.get('refresh') and is_up_to_date(state, current, cache_path):
+            print(f"Nothing has changed since the last update; {output_path} is up to date (use --force to rerun)")
+            return None
+
+    # The render projection is a superset of what enrichment reads
+    print(f"Reading {input_path}...")
+    load_stats = {}
+    publications = load_publications(input_path, RENDER_FIELDS, load_stats)
+    print(f"  Found {len(publications)} publications, {describe_skipped(load_stats)}")
+
+    # Entries are rendered as their lookups resolve, while the rest are still in flight
+    render_cache = generate_papers_md.RenderCache(render_cache_path, config) if render_cache_path else None
+    streaming = generate_papers_md.StreamingRender(publications, config, render_cache)
+    enrichment = enrich_from_openalex.enrich(publications, cache_path, **enrich,
+                                             emit=lambda pub, fields: streaming.add(pub.key, fields))
+    print()
+    if enrichment_path:
+        enrich_from_openalex.write_enrichment(enrichment, enrichment_path)
+
+    print(f"Generating markdown...")
+    publications, streamed = streaming.finish()
+    pages = generate_papers_md.generate_pages(publications, config, output_path, streamed)
+    if render_cache:
+        render_cache.save()
+        print(f"  Render cache: {render_cache.summary()}")
+    generate_papers_md.write_pages(pages, config)
+    generate_papers_md.write_exports(publications, config)
+
+    if state_path:
+        record_state(state_path, publications, input_path, output_path, cache_path,
+                     config, enrichment_path, enrich)
+
+    return pages[output_path]
+
+
+def file_signature(path: str) -> Optional[tuple]:
+    """(mtime, size) of a file, or None while it doesn't exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def wait_for_changes(path: str, interval: float = POLL_INTERVAL,
+                     settle: float = SETTLE_TIME) -> Iterator[None]:
+    """
+    Yield each time `path` changes, once it has been left alone for `settle` seconds.
+
+    With watchdog installed, file system events (inotify, FSEvents, ...) wake the
+    loop straight away; otherwise the file is polled every `interval` seconds.
+    """
+    changed = threading.Event()
+    observer = None
+    if Observer is not None:
+        target = os.path.abspath(path)
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                # Exports may be written in place or renamed over the old file
+                paths = (event.src_path, getattr(event, 'dest_path', ''))
+                if target in map(os.path.abspath, filter(None, paths)):
+                    changed.set()
+
+        observer = Observer()
+        observer.schedule(Handler(), os.path.dirname(target))
+        observer.start()
+
+    last = file_signature(path)
+    try:
+        while True:
+            changed.wait(interval)
+            changed.clear()
+            current = file_signature(path)
+            if current is None or current == last:
+                continue
+            # Debounce: wait until the export stops changing
+            while True:
+                time.sleep(settle)
+                settled = file_signature(path)
+                if settled == current:
+                    break
+                current = settled
+            last = current
+            yield
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+
+
+def watch(input_path: str = generate_papers_md.DEFAULT_INPUT,
+          output_path: str = generate_papers_md.DEFAULT_OUTPUT,
+          cache_path: str = enrich_from_openalex.CACHE_FILE,
+          config: Optional[dict] = None,
+          enrichment_path: Optional[str] = None,
+          enrich: Optional[dict] = None,
+          state_path: Optional[str] = STATE_FILE,
+          interval: float = POLL_INTERVAL):
+    """
+    Update once, then again each time the export changes, until interrupted.
+
+    The parsed library, its enrichment and the rendered entries stay in memory.
+    Each pass diffs the new export against the last one by citation key, and
+    only added or changed records are enriched and re-rendered. A refresh or
+    author prefetch only applies to the first pass. Cached entries don't go
+    stale while watching; run a normal update for that.
+
+    Args are as for run_update, plus:
+        interval: Seconds between polls when watchdog isn't installed
+    """
+    config = config or generate_papers_md.DEFAULT_CONFIG
+    enrich = enrich or {}
+    options = dict(enrich)
+    library = {}
+    enrichment = {}
+    renderer = generate_papers_md.WarmRenderCache(config)
+
+    def update_pass():
+        nonlocal library, renderer
+        start = time.perf_counter()
+        try:
+            publications = load_publications(input_path, RENDER_FIELDS)
+        except ValueError as e:
+            # Includes JSONDecodeError for a half-written export
+            print(f"Couldn't read {input_path} ({e}); waiting for the next change")
+            return
+
+        changed = [pub for pub in publications if library.get(pub.key) != pub]
+        removed = library.keys() - {pub.key for pub in publications}
+        library = {pub.key: pub for pub in publications}
+        if not changed and not removed:
+            print(f"No records changed in {input_path}")
+            return
+
+        for key in removed:
+            enrichment.pop(key, None)
+        if changed:
+            for pub in changed:
+                enrichment.pop(pub.key, None)
+            enrichment.update(enrich_from_openalex.enrich(changed, cache_path, **options))
+            options.update(refresh=False, author=None)
+        if enrichment_path:
+            enrich_from_openalex.write_enrichment(enrichment, enrichment_path)
+
+        renderer = generate_papers_md.WarmRenderCache(config, renderer.rendered)
+        publications = generate_papers_md.join_enrichment(publications, enrichment)
+        pages = generate_papers_md.generate_pages(publications, config, output_path, renderer)
+        renderer.save()
+        generate_papers_md.write_pages(pages, config)
+        generate_papers_md.write_exports(publications, config)
+        if state_path:
+            record_state(state_path, publications, input_path, output_path, cache_path,
+                         config, enrichment_path, enrich)
+
+        print(f"\n{len(changed)} added or changed, {len(removed)} removed "
+              f"({renderer.summary()}); updated {output_path} in {time.perf_counter() - start:.2f}s")
+
+    update_pass()
+    print(f"\nWatching {input_path} for changes{'' if Observer else ' (polling)'}; Ctrl-C to stop...")
+    for _ in wait_for_changes(input_path, interval):
+        print(f"\n{input_path} changed")
+        update_pass()
+
+
+def load_manifest(manifest_path: str) -> list[dict]:
+    """
+    Read a batch manifest: a JSON list of profiles.
+
+    Each profile needs 'input' (CSL-JSON export) and 'output' (page to write),
+    and may set 'highlight' (surname to bold), 'title', 'permalink' and
+    'header_note'. Relative paths are relative to the manifest.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        profiles = json.load(f)
+    if not isinstance(profiles, list):
+        raise ValueError(f"{manifest_path} should contain a list of profiles")
+
+    base = Path(manifest_path).parent
+    outputs = set()
+    for n, profile in enumerate(profiles, 1):
+        missing = [key for key in ('input', 'output') if not profile.get(key)]
+        if missing:
+            raise ValueError(f"Profile {n} in {manifest_path} has no {' or '.join(missing)}")
+        profile['input'] = str(base / profile['input'])
+        profile['output'] = str(base / profile['output'])
+        if not Path(profile['input']).exists():
+            raise ValueError(f"Input file not found: {profile['input']}")
+        if profile['output'] in outputs:
+            raise ValueError(f"More than one profile writes {profile['output']}")
+        outputs.add(profile['output'])
+    return profiles
+
+
+def profile_config(profile: dict, config: dict) -> dict:
+    """Render config for one profile of a batch."""
+    config = dict(config, header_note=profile.get('header_note'), title=profile.get('title'))
+    config['permalink'] = profile.get('permalink') or f"/{Path(profile['output']).stem}/"
+    if profile.get('highlight'):
+        config['highlight_author'] = profile['highlight']
+    return config
+
+
+def render_profile(output_path: str, publications: list, config: dict) -> tuple[float, dict]:
+    """Render and write one profile's page (run in a worker process); returns seconds and write stats."""
+    start = time.perf_counter()
+    # Workers run side by side; keep their progress lines out of the summary
+    with contextlib.redirect_stdout(io.StringIO()):
+        pages = generate_papers_md.generate_pages(publications, config, output_path)
+        # Profiles only ever write their own single page; sweeping the site's shared
+        # generated directories from side-by-side workers would delete the main site's pages
+        stats = generate_papers_md.write_pages(pages, config, sweep=False)
+    return time.perf_counter() - start, stats
+
+
+def run_batch(manifest_path: str,
+              cache_path: str = enrich_from_openalex.CACHE_FILE,
+              config: Optional[dict] = None,
+              enrich: Optional[dict] = None,
+              jobs: Optional[int] = None) -> list[dict]:
+    """
+    Enrich and render every profile in a manifest.
+
+    All exports are loaded first and their DOIs deduplicated, so a paper shared
+    by several profiles is looked up (and cached) once. Each profile then gets
+    citation counts from the shared cache, and the pages are rendered in a pool
+    of `jobs` processes (default: one per CPU).
+
+    Args:
+        manifest_path: JSON list of profiles (see load_manifest)
+        cache_path: OpenAlex cache file shared by every profile
+        config: Render config each profile's settings are applied to
+        enrich: Keyword arguments for enrich_from_openalex.enrich()
+        jobs: Worker processes for rendering
+
+    Returns:
+        One summary per profile: output, papers, load and render seconds, error (or None)
+    """
+    config = config or generate_papers_md.DEFAULT_CONFIG
+    profiles = load_manifest(manifest_path)
+
+    print(f"Reading {len(profiles)} profiles from {manifest_path}...")
+    libraries = []
+    results = []
+    for profile in profiles:
+        start = time.perf_counter()
+        publications = load_publications(profile['input'], RENDER_FIELDS)
+        libraries.append(publications)
+        results.append({'output': profile['output'], 'papers': len(publications),
+                        'load': time.perf_counter() - start, 'render': None, 'error': None})
+
+    # One representative publication per DOI across every profile
+    unique = {}
+    total = 0
+    for publications in libraries:
+        for pub in publications:
+            if pub.doi:
+                total += 1
+                unique.setdefault(csl_json.canonical_doi(pub.doi), pub)
+    print(f"  {total} DOIs across {len(profiles)} profiles, {len(unique)} distinct")
+
+    enrich_from_openalex.enrich(list(unique.values()), cache_path, **(enrich or {}))
+    print()
+
+    # Fields depend on each profile's own record (e.g. whether it already has a URL)
+    cache = enrich_from_openalex.load_cache(cache_path)
+    jobs = jobs or os.cpu_count()
+    print(f"Rendering {len(profiles)} pages with {jobs} processes...")
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for n, (profile, publications) in enumerate(zip(profiles, libraries)):
+            enrichment = {}
+            for pub in publications:
+                doi = csl_json.canonical_doi(pub.doi) if pub.doi else None
+                fields = enrich_from_openalex.enrichment_fields(pub, cache.get(doi)) if doi else {}
+                if fields:
+                    enrichment[pub.key] = {'DOI': pub.doi, **fields}
+            publications = generate_papers_md.join_enrichment(publications, enrichment)
+            future = pool.submit(render_profile, profile['output'], publications,
+                                 profile_config(profile, config))
+            futures[future] = n
+
+        for future in as_completed(futures):
+            result = results[futures[future]]
+            try:
+                result['render'], stats = future.result()
+                result['written'] = stats['written']
+            except Exception as e:
+                result['error'] = f"{type(e).__name__}: {e}"
+
+    print(f"\nProfiles:")
+    width = max(len(result['output']) for result in results)
+    for result in results:
+        line = f"  {result['output']:<{width}}  {result['papers']:5d} papers  load {result['load']:6.2f}s"
+        if result['error']:
+            line += f"  FAILED: {result['error']}"
+        else:
+            line += f"  render {result['render']:6.2f}s{'' if result['written'] else '  (unchanged)'}"
+        print(line)
+    return results
+
+
+def add_update_arguments(parser: argparse.ArgumentParser):
+    """Options for the update command: paths plus every enrich and render option."""
+    parser.add_argument(
+        '-i', '--input',
+        default=generate_papers_md.DEFAULT_INPUT,
+        help=f'Input CSL-JSON file (default: {generate_papers_md.DEFAULT_INPUT})'
+    )
+    parser.add_argument(
+        '-o', '--output',
+        default=generate_papers_md.DEFAULT_OUTPUT,
+        help=f'Output markdown file (default: {generate_papers_md.DEFAULT_OUTPUT})'
+    )
+    parser.add_argument(
+        '--write-enrichment',
+        nargs='?',
+        const=enrich_from_openalex.DEFAULT_OUTPUT,
+        metavar='FILE',
+        help=f'Also write the enrichment sidecar (default file: {enrich_from_openalex.DEFAULT_OUTPUT})'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Run even if the inputs, options and cache are unchanged since the last update'
+    )
+    parser.add_argument(
+        '--state',
+        default=STATE_FILE,
+        help=f'Fingerprints of the last successful update (default: {STATE_FILE})'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and update incrementally whenever the input file changes'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=POLL_INTERVAL,
+        metavar='SECONDS',
+        help=f'How often --watch checks the input without watchdog installed (default: {POLL_INTERVAL})'
+    )
+    enrich_from_openalex.add_enrich_arguments(parser)
+    generate_papers_md.add_render_arguments(parser)
+
+
+def add_batch_arguments(parser: argparse.ArgumentParser):
+    """Options for the batch command: the manifest, workers and the shared enrich/render options."""
+    parser.add_argument(
+        'manifest',
+        help='JSON list of profiles: {"input": ..., "output": ..., "highlight": ...}'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        metavar='N',
+        help='Processes rendering pages in parallel (default: one per CPU)'
+    )
+    enrich_from_openalex.add_enrich_arguments(parser)
+    generate_papers_md.add_render_arguments(parser)
+
+
+def check_batch_arguments(args: argparse.Namespace) -> Optional[str]:
+    """Options that can't apply to every profile of a batch; return an error message or None."""
+    if args.author:
+        return "--author prefetches one researcher's works and can't be used with batch"
+    for option in SITE_WIDE_OPTIONS:
+        if getattr(args, option) not in (None, [], generate_papers_md.DEFAULT_CONFIG.get(option)):
+            return f"--{option.replace('_', '-')} writes site-wide files and can't be used with batch"
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Update papers.md from the Zotero export in a single process.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python papers_pipeline.py update
+  python papers_pipeline.py update --write-enrichment
+  python papers_pipeline.py update --max-age 30 --concurrency 4
+  python papers_pipeline.py update --force
+  python papers_pipeline.py update --watch
+  python papers_pipeline.py batch profiles.json --jobs 4
+        """
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    update = commands.add_parser('update', help='Enrich and render papers.md')
+    add_update_arguments(update)
+    batch = commands.add_parser('batch', help='Enrich and render a page per profile in a manifest')
+    add_batch_arguments(batch)
+
+    args = parser.parse_args()
+    if args.api_base:
+        enrich_from_openalex.set_api_base(args.api_base)
+
+    if args.command == 'batch':
+        error = (enrich_from_openalex.check_enrich_arguments(args)
+                 or generate_papers_md.check_render_arguments(args)
+                 or check_batch_arguments(args))
+        if error:
+            print(f"Error: {error}", file=sys.stderr)
+            return 1
+        try:
+            results = run_batch(
+                args.manifest,
+                args.cache,
+                config=generate_papers_md.build_config(args),
+                enrich=enrich_from_openalex.enrich_options(args),
+                jobs=args.jobs,
+            )
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        return 1 if any(result['error'] for result in results) else 0
+
+    if not Path(args.input).exists():
+        print(f"Error: Input file not found: {args.input}", file=sys.stderr)
+        return 1
+
+    error = enrich_from_openalex.check_enrich_arguments(args) or generate_papers_md.check_render_arguments(args)
+    if error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+
+    if args.watch:
+        try:
+            watch(
+                args.input,
+                args.output,
+                args.cache,
+                config=generate_papers_md.build_config(args),
+                enrichment_path=args.write_enrichment,
+                enrich=enrich_from_openalex.enrich_options(args),
+                state_path=args.state,
+                interval=args.interval,
+            )
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+        return 0
+
+    markdown = run_update(
+        args.input,
+        args.output,
+        args.cache,
+        config=generate_papers_md.build_config(args),
+        enrichment_path=args.write_enrichment,
+        enrich=enrich_from_openalex.enrich_options(args),
+        force=args.force,
+        state_path=args.state,
+        render_cache_path=args.render_cache,
+    )
+    if markdown is not None:
+        print(f"\nDone! Generated {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
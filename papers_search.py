@@ -0,0 +1,119 @@
+"""
+Client-side search index for the papers page.
+
+build_search_index turns the rendered publication list into a small JSON file:
+a table of entries (entry number, year, page) and an inverted index from
+normalised words of each paper's title, authors, journal and year to rows of
+that table. assets/papers-search.js fetches it the first time a visitor uses the
+search box and filters the entries on the page without another request.
+
+Most words occur in a single paper, so the index is kept small by front-coding
+the sorted word list (each word stores how many leading characters it shares
+with the previous one, 0-9, then the rest) and by delta-encoding row lists,
+with single rows stored as plain numbers.
+"""
+
+import json
+import re
+import unicodedata
+from typing import Callable, Iterable, Optional
+
+from csl_json import Publication
+
+INDEX_VERSION = 1
+MIN_TOKEN_LENGTH = 2
+MAX_SHARED_PREFIX = 9  # front coding stores the shared prefix length as one digit
+STOPWORDS = frozenset(
+    'a an and are as at be by for from in into is of on or the to with'.split()
+)
+
+_TOKEN = re.compile(r'[^\W_]+')
+_TAG = re.compile(r'<[^>]+>')
+
+
+def normalise(text: str) -> str:
+    """
+    Lowercase and strip accents, as papers-search.js does to queries.
+
+    Both sides lowercase and then fold the letters whose case folding goes beyond
+    lowercasing (so "Straße" matches "strasse"), rather than using casefold(),
+    which JavaScript has no equivalent of.
+    """
+    folded = text.lower().replace('ß', 'ss').replace('ς', 'σ')
+    decomposed = unicodedata.normalize('NFKD', folded)
+    return ''.join(c for c in decomposed if not unicodedata.category(c).startswith('M'))
+
+
+def search_tokens(pub: Publication) -> list[str]:
+    """Distinct searchable words of a publication's title, authors, journal and year."""
+    parts = [_TAG.sub('', pub.title or ''), pub.container_title or '']
+    parts.extend(author.name for author in pub.authors)
+    tokens = {
+        token for token in _TOKEN.findall(normalise(' '.join(parts)))
+        if len(token) >= MIN_TOKEN_LENGTH and token not in STOPWORDS
+    }
+    if pub.year:
+        tokens.add(str(pub.year))
+    return sorted(tokens)
+
+
+def front_code(tokens: list[str]) -> str:
+    """Front-code sorted tokens into one space-separated string."""
+    coded = []
+    previous = ''
+    for token in tokens:
+        shared = 0
+        limit = min(len(previous), len(token), MAX_SHARED_PREFIX)
+        while shared < limit and previous[shared] == token[shared]:
+            shared += 1
+        coded.append(f"{shared}{token[shared:]}")
+        previous = token
+    return ' '.join(coded)
+
+
+def encode_rows(rows: list[int]):
+    """A single row as a number, otherwise the first row followed by the gaps."""
+    if len(rows) == 1:
+        return rows[0]
+    return [rows[0]] + [b - a for a, b in zip(rows, rows[1:])]
+
+
+def build_search_index(pages: Iterable[tuple[str, dict]],
+                       tokens_for: Optional[Callable[[Publication], list[str]]] = None) -> str:
+    """
+    Build the search index JSON.
+
+    Args:
+        pages: (permalink, {year: [numbered pubs]}) for each page, in page order
+        tokens_for: Returns a publication's tokens (default: search_tokens), e.g. from a render cache
+
+    Returns:
+        Compact JSON: {"v": 1, "pages": [permalink, ...],
+                       "entries": [[entry number, year, page row], ...],
+                       "tokens": front-coded sorted tokens,
+                       "rows": [entry rows of each token, encoded by encode_rows]}
+    """
+    tokens_for = tokens_for or search_tokens
+    permalinks = []
+    entries = []
+    index = {}
+    for permalink, by_year in pages:
+        page = len(permalinks)
+        permalinks.append(permalink)
+        # Same order as the page: newest year first, then by entry number
+        for year in sorted(by_year.keys(), reverse=True):
+            for pub in sorted(by_year[year], key=lambda x: x.entry_num or 0, reverse=True):
+                row = len(entries)
+                entries.append([pub.entry_num, str(year), page])
+                for token in tokens_for(pub):
+                    index.setdefault(token, []).append(row)
+
+    tokens = sorted(index)
+    data = {
+        'v': INDEX_VERSION,
+        'pages': permalinks,
+        'entries': entries,
+        'tokens': front_code(tokens),
+        'rows': [encode_rows(index[token]) for token in tokens],
+    }
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')) + '\n'
@@ -1,11 +1,13 @@
 #!/bin/bash
 # Update papers.md from Zotero export with OpenAlex citation counts
 #
-# Usage: ./update_papers.sh
+# Usage: ./update_papers.sh [papers_pipeline.py update options]
 #
-# This script:
-# 1. Enriches papers_zotero.json with citation counts from OpenAlex
-# 2. Generates papers.md from the enriched data
+# Reads papers_zotero.json once, looks up citation counts from OpenAlex and
+# generates papers.md in a single process (see papers_pipeline.py). It also
+# rewrites papers_enrichment.json, which a quick `python generate_papers_md.py`
+# renders from, so that never brings back older citation counts.
+# Extra arguments are passed through, e.g. ./update_papers.sh --force
 
 set -e
 
@@ -14,14 +16,7 @@ cd "$(dirname "$0")"
 echo "=== Updating Papers Page ==="
 echo
 
-# Step 1: Enrich with OpenAlex citation counts
-echo "Step 1: Enriching with OpenAlex citation counts..."
-uv run --with requests python enrich_from_openalex.py
-echo
-
-# Step 2: Generate papers.md
-echo "Step 2: Generating papers.md..."
-uv run python generate_papers_md.py -i papers_enriched.json
+uv run --with requests python papers_pipeline.py update --write-enrichment "$@"
 echo
 
 echo "=== Done! ==="